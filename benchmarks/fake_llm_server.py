@@ -0,0 +1,185 @@
+"""
+OpenAI/Groq-compatible stand-in server backed by the deterministic `local` provider.
+
+Usage: python benchmarks/fake_llm_server.py [--port 8765] [--latency-ms 200-800] [--tokens-per-second 300]
+Point a groq section of config.toml at it:
+
+    provider = "groq"
+    api_key = "fake"
+    base_url = "http://127.0.0.1:8765"
+
+Model "verdict" answers relevance checks with 1/0, any other model writes a letter.
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.ai.base import ModelConfig, Prompts  # noqa: E402
+from src.ai.models.groq import END_TAG  # noqa: E402
+from src.ai.models.local import LocalLLM  # noqa: E402
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    server: "FakeLLMServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages", [])
+        system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+        user = "\n".join(m["content"] for m in messages if m["role"] != "system")
+        model = body.get("model", "local")
+
+        llm = LocalLLM(
+            ModelConfig(
+                model,
+                max_tokens=body.get("max_tokens") or 1000,
+                latency_ms=self.server.latency_ms,
+                tokens_per_second=self.server.tokens_per_second,
+            ),
+            Prompts(system),
+        )
+        delay, tokens = llm.generate(user)
+        # Clients asking for an end tag without stop sequence expect to see it in the answer
+        if END_TAG in user and not body.get("stop"):
+            tokens.append(END_TAG)
+
+        time.sleep(delay)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if body.get("stream"):
+            self._stream(completion_id, model, tokens)
+        else:
+            self._complete(completion_id, model, tokens, len(user.split()))
+
+    def _rate_limit_headers(self):
+        # Limits are reported as never spent, so clients are throttled only by their own estimates
+        self.send_header("x-ratelimit-limit-requests", str(self.server.rpm))
+        self.send_header("x-ratelimit-remaining-requests", str(self.server.rpm))
+        self.send_header("x-ratelimit-limit-tokens", str(self.server.tpm))
+        self.send_header("x-ratelimit-remaining-tokens", str(self.server.tpm))
+
+    def _per_token(self) -> float:
+        return 1 / self.server.tokens_per_second if self.server.tokens_per_second > 0 else 0.0
+
+    def _complete(self, completion_id: str, model: str, tokens: list[str], prompt_tokens: int):
+        time.sleep(self._per_token() * len(tokens))
+        payload = json.dumps(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(tokens)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens),
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self._rate_limit_headers()
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, completion_id: str, model: str, tokens: list[str]):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self._rate_limit_headers()
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send(delta: dict, finish_reason: str | None = None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        for token in tokens:
+            time.sleep(self._per_token())
+            send({"content": token})
+        send({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        latency_ms: str = "0",
+        tokens_per_second: float = 0.0,
+        rpm: int = 100_000,
+        tpm: int = 100_000_000,
+        verbose=False,
+    ):
+        super().__init__(address, FakeLLMHandler)
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.rpm = rpm
+        self.tpm = tpm
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", default="200-800", help="Задержка до первого токена, мс")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0, help="Скорость генерации")
+    parser.add_argument("--rpm", type=int, default=100_000, help="Лимит запросов в минуту в заголовках ответа")
+    parser.add_argument("--tpm", type=int, default=100_000_000, help="Лимит токенов в минуту в заголовках ответа")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        (args.host, args.port), args.latency_ms, args.tokens_per_second, args.rpm, args.tpm, args.verbose
+    )
+    print(f"Fake LLM server on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Vacancy description to text benchmark: BeautifulSoup tree vs streaming stripper.
+
+Usage: python benchmarks/html_to_text.py [--corpus DIR] [-n NUMBER]
+DIR holds descriptions saved as *.html (e.g. `description` fields of /vacancies/{id}),
+without it a generated hh-like corpus is used.
+Outputs of both implementations are compared before timing.
+"""
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+
+from operations.apply_similar.utils.html_text import html_to_text  # noqa: E402
+
+SECTIONS = {
+    "О компании": ["Мы — &laquo;Компания&raquo;, крупнейший разработчик решений для бизнеса с 2005 года."],
+    "Обязанности:": [
+        "Разработка backend-сервисов на Python",
+        "Проектирование API и интеграций",
+        "Code review &amp; менторинг",
+    ],
+    "Требования:": ["Опыт коммерческой разработки от 3 лет", "Знание <em>PostgreSQL</em>, Redis", "Docker, CI/CD"],
+    "Мы предлагаем:": ["ДМС со стоматологией", "Гибкий график&nbsp;и удалённую работу", "Компенсацию обучения"],
+}
+
+
+def legacy_html_to_text(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+
+    for tag in soup(["script", "style"]):
+        tag.extract()
+
+    return soup.get_text(separator=" ", strip=True)
+
+
+def generate_corpus(size: int) -> list[str]:
+    rng = random.Random(0)
+    corpus = []
+    for i in range(size):
+        parts = []
+        for heading, items in SECTIONS.items():
+            chosen = rng.sample(items, k=rng.randint(1, len(items))) * rng.randint(1, 4)
+            parts.append(f"<p><strong>{heading}</strong></p><ul>" + "".join(f"<li>{x}</li>" for x in chosen) + "</ul>")
+        rng.shuffle(parts)
+        corpus.append(f"<div>Вакансия {i}<br/>" + "".join(parts) + "</div>")
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="Каталог с описаниями вакансий *.html")
+    parser.add_argument("-n", "--number", type=int, default=5, help="Повторов прогона корпуса")
+    parser.add_argument("--size", type=int, default=500, help="Размер сгенерированного корпуса")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = [p.read_text(encoding="utf-8") for p in sorted(args.corpus.glob("*.html"))]
+    else:
+        corpus = generate_corpus(args.size)
+
+    mismatches = sum(legacy_html_to_text(html) != html_to_text.__wrapped__(html) for html in corpus)
+    print(f"Descriptions: {len(corpus)}, output mismatches: {mismatches}")
+
+    def run_cached():
+        html_to_text.cache_clear()
+        for _ in range(args.number):
+            for html in corpus:
+                html_to_text(html)
+
+    for name, func in (
+        ("beautifulsoup", lambda: [legacy_html_to_text(html) for _ in range(args.number) for html in corpus]),
+        ("streaming", lambda: [html_to_text.__wrapped__(html) for _ in range(args.number) for html in corpus]),
+        ("streaming + cache", run_cached),
+    ):
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        per_item = elapsed / (len(corpus) * args.number) * 1e6
+        print(f"{name:<18} {elapsed * 1000:9.1f} ms  {per_item:8.1f} us/description")
+
+
+if __name__ == "__main__":
+    main()
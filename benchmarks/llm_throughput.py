@@ -0,0 +1,203 @@
+"""
+LLM and apply-similar throughput benchmark, runs offline.
+
+Relevance checks and cover letters are sent concurrently through:
+- `local` provider directly
+- `groq` client against fake_llm_server.py (HTTP + SDK overhead included)
+
+Then apply-similar runs end to end with --verify-relevance and AI cover letters:
+hh.ru API is replaced by a stub with fixed latency, LLM calls go to the fake server.
+reply-employers is interactive and isn't covered.
+
+Usage: python benchmarks/llm_throughput.py [-n 50] [--latency-ms 200-800] [--tokens-per-second 300]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+# After stdlib, so src/argparse.py doesn't shadow stdlib one
+sys.path.append(str(ROOT / "src"))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from tomli_w import dump as toml_dump  # noqa: E402
+
+from src.ai import LLMFactory  # noqa: E402
+from src.ai.base import BaseLLM, ModelConfig, Prompts  # noqa: E402
+from src.operations.apply_similar import Operation as ApplySimilar  # noqa: E402
+
+VACANCY = "Требования: Python, Django, PostgreSQL, опыт от {i} лет\nОбязанности: разработка сервиса номер {i}\n"
+
+
+def run(name: str, llm: BaseLLM, messages: list[str], **kwargs) -> None:
+    started = time.perf_counter()
+    results = llm.send_many(messages, **kwargs)
+    elapsed = time.perf_counter() - started
+    errors = sum(isinstance(result, Exception) for result in results)
+    print(f"{name:<28} {len(messages) / elapsed:8.1f} req/s  {elapsed:6.2f} s  errors: {errors}")
+
+
+DESCRIPTION = (
+    "<p>Компания {employer} разрабатывает финтех продукты.</p>"
+    "<p><strong>Требования:</strong></p><ul><li>Python от {i} лет</li><li>PostgreSQL, Redis</li></ul>"
+    "<p><strong>Мы предлагаем:</strong></p><ul><li>ДМС, удаленка, гибкий график</li></ul>"
+)
+
+
+class StubHHApi:
+    """hh.ru API stand-in for apply-similar, every call takes `latency` seconds"""
+
+    def __init__(self, count: int, latency: float):
+        self.latency = latency
+        self.applied = 0
+        self.items = [
+            SimpleNamespace(
+                id=str(i),
+                name=f"Python developer {i}",
+                has_test=False,
+                archived=False,
+                relations=[],
+                employer=SimpleNamespace(id=f"E{i % 20}"),
+                alternate_url=f"https://hh.ru/vacancy/{i}",
+                apply_alternate_url=f"https://hh.ru/applicant/vacancy_response?vacancyId={i}",
+                response_letter_required=True,
+                snippet=SimpleNamespace(requirement=f"Python от {i % 6} лет", responsibility=f"Разработка сервиса {i}"),
+            )
+            for i in range(count)
+        ]
+        self.similar_vacancies = SimpleNamespace(get=self._similar_vacancies)
+        self.blacklisted_employers = SimpleNamespace(get=self._blacklisted_employers)
+        self.vacancy = SimpleNamespace(get=self._vacancy)
+        self.negotiations = SimpleNamespace(post=self._apply)
+
+    def _similar_vacancies(self, resume_id: str, params: dict) -> SimpleNamespace:
+        time.sleep(self.latency)
+        page, per_page = params["page"], params["per_page"]
+        pages = max(1, -(-len(self.items) // per_page))
+        return SimpleNamespace(items=self.items[page * per_page : (page + 1) * per_page], pages=pages)
+
+    def _blacklisted_employers(self, page: int) -> SimpleNamespace:
+        time.sleep(self.latency)
+        return SimpleNamespace(items=[], found=0, pages=1)
+
+    def _vacancy(self, vacancy_id: str) -> SimpleNamespace:
+        time.sleep(self.latency)
+        employer = f"E{int(vacancy_id) % 20}"
+        return SimpleNamespace(
+            name=f"Python developer {vacancy_id}",
+            description=DESCRIPTION.format(employer=employer, i=vacancy_id),
+            key_skills=[SimpleNamespace(name="Python"), SimpleNamespace(name="PostgreSQL")],
+            employer=SimpleNamespace(id=employer, name=f"Company {employer}"),
+            experience=SimpleNamespace(name="От 3 до 6 лет"),
+        )
+
+    def _apply(self, params: dict) -> bool:
+        time.sleep(self.latency)
+        self.applied += 1
+        return True
+
+
+def run_apply_similar(args: argparse.Namespace, base_url: str, data_dir: Path) -> None:
+    def options(model: str) -> dict:
+        return {
+            "provider": "groq",
+            "model_name": model,
+            "api_key": "fake",
+            "base_url": base_url,
+            "max_concurrency": args.concurrency,
+            "cache": False,
+        }
+
+    config_path = data_dir / "config.toml"
+    with config_path.open("wb") as f:
+        toml_dump(
+            {
+                "candidate": {"info": "Python разработчик, 5 лет опыта"},
+                "llm": {
+                    "cover_letters": {"options": options("letter"), "prompts": {"system": "Напиши письмо"}},
+                    "verify_relevance": {"options": options("verdict"), "prompts": {"system": "Ответь 1 или 0"}},
+                },
+            },
+            f,
+        )
+
+    parser = argparse.ArgumentParser()
+    operation = ApplySimilar()
+    operation.setup_parser(parser)
+    op_args = parser.parse_args(
+        [
+            "--resume-id=R",
+            "--ai",
+            "--verify-relevance",
+            "--apply-interval=0",
+            "--page-interval=0",
+            f"--prepare-workers={args.prepare_workers}",
+        ]
+    )
+    op_args.config_path = str(config_path)
+    op_args.data_path = str(data_dir)
+
+    api = StubHHApi(args.number, args.api_latency_ms / 1000)
+    started = time.perf_counter()
+    # Applies are printed one per line
+    with contextlib.redirect_stdout(io.StringIO()):
+        operation.run(op_args, api)  # pyright: ignore[reportArgumentType]
+    elapsed = time.perf_counter() - started
+    print(
+        f"{'apply-similar end to end':<28} {args.number / elapsed:8.1f} vac/s  {elapsed:6.2f} s  "
+        f"applied: {api.applied}/{args.number}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=50, help="Запросов на сценарий")
+    parser.add_argument("--latency-ms", default="200-800")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--api-latency-ms", type=float, default=50.0, help="Задержка ответа заглушки hh.ru API")
+    parser.add_argument("--prepare-workers", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(("127.0.0.1", 0), args.latency_ms, args.tokens_per_second)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    messages = [VACANCY.format(i=i) for i in range(args.number)]
+    prompts = Prompts("Ты помогаешь откликаться на вакансии")
+    common = dict(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        max_concurrency=args.concurrency,
+        cache=False,
+    )
+    try:
+        for model in ("verdict", "letter"):
+            kwargs = {"verify_tag_end": True} if model == "letter" else {}
+            local = LLMFactory.create("local", ModelConfig(model, **common), prompts)
+            run(f"local/{model}", local, messages, **kwargs)
+
+            groq = LLMFactory.create(
+                "groq", ModelConfig(model, api_key="fake", base_url=server.base_url, **common), prompts
+            )
+            run(f"groq+fake server/{model}", groq, messages, **kwargs)
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            # Blocked vacancies are stored in the default data dir
+            os.environ["XDG_CONFIG_HOME"] = data_dir
+            run_apply_similar(args, server.base_url, Path(data_dir))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Spintax rendering benchmark: legacy `re.sub` loop vs precompiled templates.
+
+Usage: python benchmarks/spintax.py [-n NUMBER]
+Templates are taken from config/config.toml.example.
+"""
+
+import argparse
+import random
+import re
+import sys
+import timeit
+import tomllib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils import compile_template  # noqa: E402
+
+PLACEHOLDERS = {
+    "vacancy_name": "Python Developer",
+    "employer_name": "Company",
+    "first_name": "Ivan",
+    "last_name": "Ivanov",
+    "email": "ivan@example.com",
+    "phone": "+70000000000",
+}
+
+
+def legacy_random_text(s: str) -> str:
+    while (temp := re.sub(r"{([^{}]+)}", lambda m: random.choice(m.group(1).split("|")), s)) != s:
+        s = temp
+    return s
+
+
+def load_templates() -> list[str]:
+    with (ROOT / "config" / "config.toml.example").open("rb") as f:
+        data = tomllib.load(f)
+    messages = data["default_messages"]
+    templates = [msg.strip() for msg in messages["cover_letter"]["messages"]]
+    templates.append(messages["chat_reply"]["message"])
+    return sorted(templates, key=len, reverse=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for template in load_templates():
+        compiled = compile_template(template)
+        legacy = timeit.timeit(lambda: legacy_random_text(template) % PLACEHOLDERS, number=args.number)
+        current = timeit.timeit(lambda: compiled.render(PLACEHOLDERS), number=args.number)
+        print(f"{template[:60]!r}")
+        print(f"  legacy:   {legacy / args.number * 1e6:8.2f} us/render")
+        print(f"  compiled: {current / args.number * 1e6:8.2f} us/render ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
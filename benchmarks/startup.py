@@ -0,0 +1,83 @@
+"""
+CLI startup benchmark based on `python -X importtime`.
+
+Usage: python benchmarks/startup.py [-n NUMBER]
+For every command line the CLI is started in a fresh interpreter, parses arguments and exits on --help.
+"eager" emulates the old discovery that imported every operation module while building the parser.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+COMMANDS = [["--help"], ["whoami", "--help"], ["refresh-token", "--help"], ["apply-similar", "--help"]]
+
+# Installed package puts src modules after stdlib in sys.path, so src/argparse.py doesn't shadow stdlib one
+CLI = """
+import sys
+sys.path.append({src!r})
+from src.main import main
+{eager}
+try:
+    main({argv!r})
+except SystemExit:
+    pass
+"""
+
+EAGER = """
+from importlib import import_module
+from pkgutil import iter_modules
+for _, name, _ in iter_modules([{operations!r}]):
+    import_module(f"src.operations.{{name}}")
+"""
+
+IMPORT_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run(argv: list[str], eager: bool) -> tuple[float, float, int]:
+    """Return wall time, total import time (seconds) and number of imported modules"""
+    code = CLI.format(
+        src=str(ROOT / "src"),
+        argv=argv,
+        eager=EAGER.format(operations=str(ROOT / "src" / "operations")) if eager else "",
+    )
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    wall = time.perf_counter() - started
+
+    modules = [m for m in IMPORT_RE.finditer(proc.stderr)]
+    total_us = sum(int(m.group(1)) for m in modules)
+    return wall, total_us / 1e6, len(modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=5, help="Запусков на команду")
+    args = parser.parse_args()
+
+    print(f"{'command':<28} {'mode':<6} {'wall, ms':>9} {'imports, ms':>12} {'modules':>8}")
+    for argv in COMMANDS:
+        for eager in (True, False):
+            results = [run(argv, eager) for _ in range(args.number)]
+            wall = statistics.median(r[0] for r in results) * 1000
+            imports = statistics.median(r[1] for r in results) * 1000
+            modules = results[-1][2]
+            mode = "eager" if eager else "lazy"
+            print(f"{' '.join(argv):<28} {mode:<6} {wall:9.1f} {imports:12.1f} {modules:8d}")
+
+
+if __name__ == "__main__":
+    main()
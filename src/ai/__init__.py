@@ -1,14 +1,92 @@
-from src.ai.base import ModelConfig, Prompts
+import logging
+import time
+from dataclasses import astuple
+from pathlib import Path
+from threading import Lock
+from typing import Sequence
+
+from src.ai.base import BaseLLM, ModelConfig, Prompts
+from src.ai.cache import CachedLLM
+from src.ai.hedge import HedgedLLM
 from src.ai.models.groq import GroqLLM
+from src.ai.models.local import LocalLLM
+from src.ai.router import LLMRouter
+
+logger = logging.getLogger(__package__)
 
 
 class LLMFactory:
     providers = {
         "groq": GroqLLM,
+        "local": LocalLLM,
     }
 
+    # Process-wide registry of built clients, so SDK clients and their connections are reused
+    _registry: dict[tuple, BaseLLM] = {}
+    _registry_lock = Lock()
+    constructed = 0
+
     @classmethod
-    def create(cls, provider: str, cfg: ModelConfig, prompts: Prompts):
+    def create(cls, provider: str, cfg: ModelConfig, prompts: Prompts, data_path: str | Path | None = None):
+        """`data_path` is the dir of responses cache, default config dir if not set"""
         if provider not in cls.providers:
             raise ValueError(f"Unknown provider: {provider}")
-        return cls.providers[provider](cfg, prompts)
+        llm = cls.providers[provider](cfg, prompts)
+        return CachedLLM(llm, provider, config_path=data_path) if cfg.cache else llm
+
+    @classmethod
+    def get(cls, provider: str, cfg: ModelConfig, prompts: Prompts, data_path: str | Path | None = None) -> BaseLLM:
+        """Return client from registry keyed by provider, model config and prompts, build it on first use"""
+        key = (provider, astuple(cfg), prompts.system, str(data_path))
+        with cls._registry_lock:
+            if (llm := cls._registry.get(key)) is not None:
+                return llm
+
+            started = time.perf_counter()
+            llm = cls._registry[key] = cls.create(provider, cfg, prompts, data_path)
+            cls.constructed += 1
+            logger.info(
+                "Built %s client for %s in %.1f ms (clients built: %d)",
+                provider,
+                cfg.model_name,
+                (time.perf_counter() - started) * 1000,
+                cls.constructed,
+            )
+            return llm
+
+    @classmethod
+    def get_router(
+        cls,
+        backends: Sequence[tuple[str, ModelConfig]],
+        prompts: Prompts,
+        hedge: bool = False,
+        data_path: str | Path | None = None,
+    ) -> BaseLLM:
+        """
+        Return router over backends from registry, a single backend is returned as is.
+        With `hedge` slow calls are duplicated, meant for interactive use only.
+        """
+        llms = [cls.get(provider, cfg, prompts, data_path) for provider, cfg in backends]
+        key = (
+            "router",
+            tuple((provider, astuple(cfg)) for provider, cfg in backends),
+            prompts.system,
+            str(data_path),
+        )
+        with cls._registry_lock:
+            if len(llms) == 1:
+                llm = llms[0]
+            elif (llm := cls._registry.get(key)) is None:
+                names = [_backend_name(i, provider, cfg) for i, (provider, cfg) in enumerate(backends)]
+                llm = cls._registry[key] = LLMRouter(list(zip(names, llms)))
+
+            if hedge:
+                if (hedged := cls._registry.get(("hedged", key))) is None:
+                    hedged = cls._registry[("hedged", key)] = HedgedLLM(llm)
+                return hedged
+            return llm
+
+
+def _backend_name(index: int, provider: str, cfg: ModelConfig) -> str:
+    key_hint = f"…{cfg.api_key[-4:]}" if cfg.api_key else "-"
+    return f"{index}:{provider}/{cfg.model_name}/{key_hint}"
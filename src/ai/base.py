@@ -1,6 +1,9 @@
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from threading import BoundedSemaphore
+from typing import Any, Callable, Optional, Sequence
 
 
 @dataclass
@@ -10,6 +13,15 @@ class ModelConfig:
     temperature: float = 0.7
     max_tokens: int = 1000
     top_p: float = 0.9
+    max_concurrency: int = 4
+    cache: bool = True
+    # OpenAI-compatible endpoint instead of provider's default one
+    base_url: Optional[str] = None
+    # Local provider only: first token delay interval and generation rate
+    latency_ms: str = "0"
+    tokens_per_second: float = 0.0
+    # Deadline of one call, seconds, 0 - provider default
+    timeout: float = 0.0
 
 
 @dataclass
@@ -25,8 +37,56 @@ class BaseLLM(ABC):
     def __init__(self, cfg: ModelConfig, prompts: Prompts):
         self.cfg = cfg
         self.prompts = prompts
+        # Shared by send_many and asend, limits in-flight requests of this client
+        self._concurrency = BoundedSemaphore(max(1, cfg.max_concurrency))
 
     @abstractmethod
     def send_message(self, user_message: str, *args, **kwargs) -> str:
         """Return model-generated text"""
         pass
+
+    def stream_message(
+        self, user_message: str, on_token: Callable[[str], None] | None = None, verify_tag_end: bool = False
+    ) -> str:
+        """
+        Pass model-generated text to `on_token` as it arrives and return the whole text.
+        Providers without streaming support emit the full response at once.
+        """
+        response = self.send_message(user_message, verify_tag_end=verify_tag_end)
+        if on_token is not None:
+            on_token(response)
+        return response
+
+    def fresh(self) -> "BaseLLM":
+        """Client that always asks the model, bypassing response cache"""
+        return self
+
+    def _send_limited(self, user_message: str, **kwargs: Any) -> str:
+        with self._concurrency:
+            return self.send_message(user_message, **kwargs)
+
+    def send_many(self, user_messages: Sequence[str], **kwargs: Any) -> list[str | LLMError]:
+        """
+        Send messages concurrently within client concurrency limit.
+        Results keep the order of messages, a failed item is returned as LLMError instead of raising.
+        """
+        if not user_messages:
+            return []
+
+        workers = min(len(user_messages), max(1, self.cfg.max_concurrency))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as executor:
+            futures = [executor.submit(self._send_limited, msg, **kwargs) for msg in user_messages]
+
+        rv: list[str | LLMError] = []
+        for future in futures:
+            try:
+                rv.append(future.result())
+            except LLMError as ex:
+                rv.append(ex)
+            except Exception as ex:
+                rv.append(LLMError(f"{ex}"))
+        return rv
+
+    async def asend(self, user_message: str, **kwargs: Any) -> str:
+        """Async version of send_message, runs in a worker thread within client concurrency limit"""
+        return await asyncio.to_thread(self._send_limited, user_message, **kwargs)
@@ -0,0 +1,142 @@
+import json
+import logging
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable
+
+from src.ai.base import BaseLLM
+from src.utils import get_config_path, make_hash
+from state import get_state_store
+
+logger = logging.getLogger(__package__)
+
+DEFAULT_MAX_ENTRIES = 2000
+
+
+class LLMResponseCache:
+    """
+    LLM responses cache with LRU eviction.
+    Table `responses` of the state database.
+    """
+
+    def __init__(self, config_path: str | Path | None = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._store = get_state_store(config_path or get_config_path())
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        row = self._store.query_one("SELECT response FROM responses WHERE key = ?", (key,))
+        if row is None:
+            self.misses += 1
+            return None
+        with self._store.transaction() as conn:
+            conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        with self._store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, used_at) VALUES (?, ?, ?)",
+                (key, response, time.time()),
+            )
+            # Evict least recently used entries
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+_caches: dict[Path, LLMResponseCache] = {}
+_caches_lock = Lock()
+
+
+def get_response_cache(config_path: str | Path | None = None) -> LLMResponseCache:
+    """Process-wide cache of the data dir, opened on first use"""
+    path = Path(config_path or get_config_path()).resolve()
+    with _caches_lock:
+        if (cache := _caches.get(path)) is None:
+            cache = _caches[path] = LLMResponseCache(path)
+        return cache
+
+
+class CachedLLM(BaseLLM):
+    """
+    Serves repeated prompts from on-disk cache.
+    Key is built from provider, model options, system prompt and user message.
+    Use `fresh()` to get a new sample, e.g. when user asks to regenerate an answer.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        provider: str,
+        cache: LLMResponseCache | None = None,
+        config_path: str | Path | None = None,
+    ):
+        super().__init__(llm.cfg, llm.prompts)
+        self.llm = llm
+        self.provider = provider
+        self.config_path = config_path
+        self._response_cache = cache
+
+    @property
+    def response_cache(self) -> LLMResponseCache:
+        if self._response_cache is None:
+            self._response_cache = get_response_cache(self.config_path)
+        return self._response_cache
+
+    def fresh(self) -> BaseLLM:
+        return self.llm
+
+    def _key(self, user_message: str, *args: Any, **kwargs: Any) -> str:
+        return make_hash(
+            json.dumps(
+                [
+                    self.provider,
+                    self.cfg.model_name,
+                    self.cfg.temperature,
+                    self.cfg.top_p,
+                    self.cfg.max_tokens,
+                    self.prompts.system,
+                    user_message,
+                    args,
+                    kwargs,
+                ],
+                ensure_ascii=False,
+                sort_keys=True,
+            )
+        )
+
+    def _cached(self, send: Callable[[], str], user_message: str, *args: Any, **kwargs: Any) -> str:
+        key = self._key(user_message, *args, **kwargs)
+        cache = self.response_cache
+        if (response := cache.get(key)) is not None:
+            logger.info("LLM cache hit (hits: %d, misses: %d)", cache.hits, cache.misses)
+            return response
+
+        response = send()
+        if response:
+            cache.put(key, response)
+        return response
+
+    def send_message(self, user_message: str, *args: Any, **kwargs: Any) -> str:
+        return self._cached(lambda: self.llm.send_message(user_message, *args, **kwargs), user_message, *args, **kwargs)
+
+    def stream_message(
+        self, user_message: str, on_token: Callable[[str], None] | None = None, verify_tag_end: bool = False
+    ) -> str:
+        streamed = False
+
+        def send() -> str:
+            nonlocal streamed
+            streamed = True
+            return self.llm.stream_message(user_message, on_token=on_token, verify_tag_end=verify_tag_end)
+
+        response = self._cached(send, user_message, verify_tag_end=verify_tag_end)
+        if not streamed and on_token is not None:
+            on_token(response)
+        return response
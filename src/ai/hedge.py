@@ -0,0 +1,161 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable
+
+from src.ai.base import BaseLLM, LLMError
+
+logger = logging.getLogger(__package__)
+
+# Latency samples kept to estimate p90
+LATENCY_WINDOW = 50
+# Until enough samples are collected, hedge is fired after this delay, seconds
+MIN_SAMPLES = 5
+DEFAULT_HEDGE_DELAY = 3.0
+
+# Shared by all hedged clients, losing attempts finish here in background
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    timeouts: int = 0
+
+
+class _Latencies:
+    def __init__(self) -> None:
+        self._samples: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+
+    def p90(self) -> float:
+        if len(self._samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+
+
+class HedgedLLM(BaseLLM):
+    """
+    Interactive calls with a deadline and a hedge against slow responses.
+    If the answer (the first token when streaming) is not there by p90 of recent latencies,
+    a duplicate request is sent and whichever answers first wins.
+    Behind a router the duplicate goes to the least busy backend.
+    The loser is left to finish in background, its answer is dropped.
+    """
+
+    def __init__(self, llm: BaseLLM):
+        super().__init__(llm.cfg, llm.prompts)
+        self.llm = llm
+        self.timeout = llm.cfg.timeout or None
+        self.hedge_stats = HedgeStats()
+        self._send_latencies = _Latencies()
+        self._first_token_latencies = _Latencies()
+        self._lock = Lock()
+
+    def fresh(self) -> BaseLLM:
+        hedged = HedgedLLM(self.llm.fresh())
+        # Latency history and stats are shared with the cached view
+        hedged.hedge_stats = self.hedge_stats
+        hedged._send_latencies = self._send_latencies
+        hedged._first_token_latencies = self._first_token_latencies
+        hedged._lock = self._lock
+        return hedged
+
+    def _race(
+        self,
+        call: Callable[[int], str],
+        latencies: _Latencies,
+        answered: Callable[[], bool],
+    ) -> str:
+        """
+        Run `call(attempt)` and hedge it with the second attempt after p90 latency.
+        `answered()` tells whether an attempt has already answered (e.g. streamed first token),
+        such calls record their latency themselves.
+        """
+        started_at = time.monotonic()
+        deadline = started_at + self.timeout if self.timeout else None
+        with self._lock:
+            self.hedge_stats.calls += 1
+
+        futures: dict[Future[str], int] = {_executor.submit(call, 0): 0}
+        hedge_at = started_at + latencies.p90()
+        # At most one duplicate per call, even if the first attempt has already failed
+        hedged = False
+        while True:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                with self._lock:
+                    self.hedge_stats.timeouts += 1
+                raise LLMError(f"No answer from LLM in {self.timeout:.0f}s")
+
+            if not hedged and not answered() and now >= hedge_at:
+                logger.info(f"LLM answer is slower than {hedge_at - started_at:.1f}s, sending hedge request")
+                with self._lock:
+                    self.hedge_stats.hedges += 1
+                futures[_executor.submit(call, 1)] = 1
+                hedged = True
+
+            timeouts = [t - now for t in (deadline, None if hedged else hedge_at) if t is not None]
+            done, _ = wait(futures, timeout=max(0.0, min(timeouts)) if timeouts else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = futures.pop(future)
+                try:
+                    response = future.result()
+                except LLMError:
+                    # The other attempt may still succeed
+                    if futures:
+                        continue
+                    raise
+
+                if attempt == 1:
+                    with self._lock:
+                        self.hedge_stats.hedge_wins += 1
+                    logger.info(f"Hedge request won, stats: {self.hedge_stats}")
+                if not answered():
+                    latencies.add(time.monotonic() - started_at)
+                return response
+
+    def send_message(self, user_message: str, *args: Any, **kwargs: Any) -> str:
+        return self._race(
+            lambda _: self.llm.send_message(user_message, *args, **kwargs),
+            self._send_latencies,
+            answered=lambda: False,
+        )
+
+    def stream_message(
+        self, user_message: str, on_token: Callable[[str], None] | None = None, verify_tag_end: bool = False
+    ) -> str:
+        started_at = time.monotonic()
+        # Attempt that streamed first owns the output, tokens of the other one are dropped
+        owner: int | None = None
+        lock = Lock()
+
+        def call(attempt: int) -> str:
+            nonlocal owner
+
+            def emit(token: str) -> None:
+                nonlocal owner
+                with lock:
+                    if owner is None:
+                        owner = attempt
+                        self._first_token_latencies.add(time.monotonic() - started_at)
+                if owner == attempt and on_token is not None:
+                    on_token(token)
+
+            response = self.llm.stream_message(user_message, on_token=emit, verify_tag_end=verify_tag_end)
+            with lock:
+                if owner is None:
+                    owner = attempt
+                elif owner != attempt:
+                    raise LLMError("Hedged attempt lost")
+            return response
+
+        return self._race(call, self._first_token_latencies, answered=lambda: owner is not None)
@@ -1,10 +1,19 @@
 import logging
 import time
+from typing import Any, Callable, Iterable
 
 from src.ai.base import BaseLLM, LLMError, ModelConfig, Prompts
+from src.ai.rate_limit import get_rate_limiter
 
 logger = logging.getLogger(__package__)
 
+END_TAG = "<END>"
+# Attempts after 429 response before giving up
+RATE_LIMIT_RETRIES = 3
+# Attempts after connection errors, timeouts and 5xx, same as default of groq SDK
+TRANSIENT_RETRIES = 2
+TRANSIENT_BACKOFF = 0.5
+
 
 class GroqLLM(BaseLLM):
     def __init__(self, cfg: ModelConfig, prompts: Prompts):
@@ -14,7 +23,10 @@ class GroqLLM(BaseLLM):
         if not cfg.api_key:
             raise LLMError("No api key is defined in config.toml")
 
-        self.client = Groq(api_key=cfg.api_key)
+        # Retries are done in `_create`: 429 by rate limiter, so all clients of the account back off together
+        kwargs = {"timeout": cfg.timeout} if cfg.timeout else {}
+        self.client = Groq(api_key=cfg.api_key, base_url=cfg.base_url, max_retries=0, **kwargs)
+        self.rate_limiter = get_rate_limiter("groq", cfg.api_key)
 
     def send_message(self, user_message: str, verify_tag_end: bool = False) -> str:
         if verify_tag_end:
@@ -27,13 +39,7 @@ class GroqLLM(BaseLLM):
             retry_count = 0
 
             while not finished and retry_count < 3:
-                completion = self.client.chat.completions.create(
-                    model=self.cfg.model_name,
-                    messages=messages,  # type: ignore
-                    temperature=self.cfg.temperature,
-                    max_tokens=self.cfg.max_tokens,
-                    top_p=self.cfg.top_p,
-                )
+                completion = self._create(messages)
 
                 content = completion.choices[0].message.content
                 if not content:
@@ -50,7 +56,6 @@ class GroqLLM(BaseLLM):
                     else:
                         messages.append({"role": "user", "content": "Продолжи с того места, где остановился."})
                         retry_count += 1
-                        time.sleep(0.5)
                 else:
                     finished = True
 
@@ -64,3 +69,132 @@ class GroqLLM(BaseLLM):
 
         except Exception as ex:
             raise LLMError(f"{ex}") from ex
+
+    def _create(self, messages: list[dict[str, str]], **kwargs: Any) -> Any:
+        """Create completion within account rate limits, retry after 429 and transient errors"""
+        from groq import APIConnectionError, InternalServerError, RateLimitError
+
+        estimate = self.rate_limiter.estimate(messages, self.cfg.max_tokens)
+        rate_limited = failed = 0
+        while True:
+            self.rate_limiter.acquire(estimate)
+            try:
+                raw = self.client.chat.completions.with_raw_response.create(
+                    model=self.cfg.model_name,
+                    messages=messages,  # type: ignore
+                    temperature=self.cfg.temperature,
+                    max_tokens=self.cfg.max_tokens,
+                    top_p=self.cfg.top_p,
+                    **kwargs,
+                )
+            except RateLimitError as ex:
+                self.rate_limiter.rate_limited(ex.response.headers)
+                rate_limited += 1
+                if rate_limited > RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            except (APIConnectionError, InternalServerError) as ex:
+                failed += 1
+                if failed > TRANSIENT_RETRIES:
+                    raise
+                delay = TRANSIENT_BACKOFF * 2 ** (failed - 1)
+                logger.warning(f"LLM request failed: {ex}, retry in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            completion = raw.parse()
+            usage = getattr(completion, "usage", None)
+            self.rate_limiter.update(raw.headers, getattr(usage, "completion_tokens", None))
+            return completion
+
+    def stream_message(
+        self, user_message: str, on_token: Callable[[str], None] | None = None, verify_tag_end: bool = False
+    ) -> str:
+        """
+        Stream completion tokens to `on_token`.
+        Generation stops on the end tag, continuation is requested only if the answer was cut by max_tokens.
+        """
+        if verify_tag_end:
+            user_message += f"\nПометь конец письма тегом {END_TAG}."
+        stop_marker = END_TAG if verify_tag_end else None
+        try:
+            messages = [{"role": "system", "content": self.prompts.system}, {"role": "user", "content": user_message}]
+
+            response = ""
+            finished = False
+            retry_count = 0
+            started_at = time.perf_counter()
+            # Time to first token, kept per call since the client is shared between threads
+            ttft: float | None = None
+
+            while not finished and retry_count < 3:
+                stream = self._create(messages, stop=stop_marker, stream=True)
+                part, finished, first_token_at = self._read_stream(stream, on_token, stop_marker)
+                if ttft is None and first_token_at is not None:
+                    ttft = first_token_at - started_at
+                response += part
+
+                if not finished:
+                    messages.append({"role": "assistant", "content": part})
+                    messages.append({"role": "user", "content": "Продолжи с того места, где остановился."})
+                    retry_count += 1
+
+            if not finished:
+                logger.warning("Письмо могло быть обрезано, но достигнут лимит повторов.")
+
+            logger.info(
+                "Streamed msg in %.0f ms, time to first token %s ms, rate limit headroom %.0f%%: %s",
+                (time.perf_counter() - started_at) * 1000,
+                f"{ttft * 1000:.0f}" if ttft is not None else "-",
+                self.rate_limiter.headroom * 100,
+                response,
+            )
+            return response.strip()
+
+        except Exception as ex:
+            raise LLMError(f"{ex}") from ex
+
+    def _read_stream(
+        self,
+        stream: Iterable[Any],
+        on_token: Callable[[str], None] | None,
+        stop_marker: str | None,
+    ) -> tuple[str, bool, float | None]:
+        """
+        Return streamed text, whether generation is finished (not cut by max_tokens)
+        and `perf_counter()` of the first token
+        """
+        text = ""
+        first_token_at: float | None = None
+        emitted = 0
+        finished = False
+        # Tail that could be the beginning of stop marker is held back until next chunk
+        hold_back = len(stop_marker) - 1 if stop_marker else 0
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = (choice.delta.content or "").replace("—", "-")
+                if delta and first_token_at is None:
+                    first_token_at = time.perf_counter()
+                text += delta
+
+                if stop_marker and stop_marker in text:
+                    text = text[: text.index(stop_marker)]
+                    finished = True
+                    break
+                if choice.finish_reason:
+                    finished = choice.finish_reason != "length"
+
+                if on_token is not None and (safe := len(text) - hold_back) > emitted:
+                    on_token(text[emitted:safe])
+                    emitted = safe
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+        if on_token is not None and len(text) > emitted:
+            on_token(text[emitted:])
+        return text, finished, first_token_at
@@ -0,0 +1,71 @@
+import logging
+import random
+import re
+import time
+from typing import Callable
+
+from src.ai.base import BaseLLM, LLMError, ModelConfig, Prompts
+from src.utils import make_hash, parse_interval
+
+logger = logging.getLogger(__package__)
+
+# Model answering relevance checks with "1" / "0", any other model name generates text
+VERDICT_MODEL = "verdict"
+# Share of vacancies considered relevant by verdict model
+RELEVANT_SHARE = 0.8
+
+WORD_RE = re.compile(r"\w{3,}")
+FALLBACK_WORDS = ("опыт", "команда", "проект", "задачи", "разработка", "интерес")
+
+
+class LocalLLM(BaseLLM):
+    """
+    Offline provider for benchmarks and tests, no network or api key needed.
+    Answers are deterministic: the same prompt always gives the same text, latency and verdict.
+    - latency_ms: delay before the first token, "min-max" interval
+    - tokens_per_second: generation rate, 0 means instant
+    """
+
+    def __init__(self, cfg: ModelConfig, prompts: Prompts):
+        super().__init__(cfg, prompts)
+        try:
+            self.latency = parse_interval(cfg.latency_ms)
+        except ValueError as ex:
+            raise LLMError(f"Invalid latency_ms: {cfg.latency_ms}") from ex
+
+    def _rng(self, user_message: str) -> random.Random:
+        return random.Random(make_hash(self.cfg.model_name + self.prompts.system + user_message))
+
+    def generate(self, user_message: str) -> tuple[float, list[str]]:
+        """Return first token delay in seconds and answer tokens"""
+        rng = self._rng(user_message)
+        delay = rng.uniform(*self.latency) / 1000
+
+        if self.cfg.model_name == VERDICT_MODEL:
+            return delay, ["1" if rng.random() < RELEVANT_SHARE else "0"]
+
+        words = WORD_RE.findall(user_message.lower()) or list(FALLBACK_WORDS)
+        count = min(self.cfg.max_tokens, rng.randint(40, 120))
+        tokens = ["Здравствуйте!"] + [" " + rng.choice(words) for _ in range(count - 1)]
+        return delay, tokens
+
+    def send_message(self, user_message: str, verify_tag_end: bool = False) -> str:
+        return self.stream_message(user_message, verify_tag_end=verify_tag_end)
+
+    def stream_message(
+        self, user_message: str, on_token: Callable[[str], None] | None = None, verify_tag_end: bool = False
+    ) -> str:
+        delay, tokens = self.generate(user_message)
+        time.sleep(delay)
+
+        per_token = 1 / self.cfg.tokens_per_second if self.cfg.tokens_per_second > 0 else 0.0
+        if on_token is None:
+            time.sleep(per_token * len(tokens))
+        else:
+            for token in tokens:
+                time.sleep(per_token)
+                on_token(token)
+
+        response = "".join(tokens)
+        logger.debug(f"Generated msg: {response}")
+        return response
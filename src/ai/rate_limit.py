@@ -0,0 +1,182 @@
+import logging
+import math
+import re
+import time
+from threading import Condition, Lock
+from typing import Any, Iterable, Mapping
+
+logger = logging.getLogger(__package__)
+
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+# Rough average length of a BPE token
+CHARS_PER_TOKEN = 4
+# Weight of the last response in average completion size
+COMPLETION_EMA_ALPHA = 0.2
+# Limits are unknown until the first response, assume a small free tier
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Parse provider reset durations: `7.66s`, `2m59.56s`, `1h2m`, `500ms` or plain seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> float | None:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Bucket refilled continuously up to `capacity` within one `period` seconds"""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.period = period
+        self.available = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        rate = self.capacity / self.period
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available, amount above capacity waits for a full bucket"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing * self.period / self.capacity)
+
+    def take(self, amount: float) -> None:
+        self.available -= amount
+
+    def sync(self, limit: float | None, remaining: float | None, reset: float | None, now: float) -> None:
+        """Align bucket with provider's view: its limit, what is left and when it is fully restored"""
+        if limit:
+            self.capacity = limit
+            if reset and remaining is not None and remaining < limit:
+                # Provider restores the whole deficit by `reset`
+                self.period = max(1.0, reset * limit / (limit - remaining))
+        if remaining is not None:
+            self.available = min(self.capacity, remaining)
+        self.updated_at = now
+
+    @property
+    def headroom(self) -> float:
+        return max(0.0, self.available) / self.capacity if self.capacity else 0.0
+
+
+class RateLimiter:
+    """
+    Schedules LLM calls of one account under its requests-per-minute and tokens-per-minute limits.
+    Limits are learned from `x-ratelimit-*` response headers, 429 responses pause all calls until `retry-after`.
+    Tokens of a request are estimated from prompt size plus average completion size seen so far.
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.completion_tokens: float | None = None
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self._cond = Condition(Lock())
+
+    def estimate(self, messages: Iterable[Mapping[str, Any]], max_tokens: int) -> int:
+        prompt = sum(len(str(m.get("content") or "")) for m in messages)
+        completion = self.completion_tokens if self.completion_tokens is not None else max_tokens / 2
+        return math.ceil(prompt / CHARS_PER_TOKEN + min(completion, max_tokens))
+
+    def acquire(self, tokens: int) -> None:
+        """Block until request fits into both buckets, then reserve it"""
+        waited = 0.0
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(tokens, now),
+                )
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+                waited += wait
+
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.waited += waited
+        if waited:
+            logger.debug(f"Waited {waited:.2f}s for LLM rate limit, headroom {self.headroom:.0%}")
+
+    def update(self, headers: Mapping[str, str], completion_tokens: int | None = None) -> None:
+        """Sync buckets with response headers of a successful call"""
+        now = time.monotonic()
+        with self._cond:
+            self.requests.sync(
+                _header_float(headers, "x-ratelimit-limit-requests"),
+                _header_float(headers, "x-ratelimit-remaining-requests"),
+                parse_duration(headers.get("x-ratelimit-reset-requests")),
+                now,
+            )
+            self.tokens.sync(
+                _header_float(headers, "x-ratelimit-limit-tokens"),
+                _header_float(headers, "x-ratelimit-remaining-tokens"),
+                parse_duration(headers.get("x-ratelimit-reset-tokens")),
+                now,
+            )
+            if completion_tokens is not None:
+                if self.completion_tokens is None:
+                    self.completion_tokens = completion_tokens
+                else:
+                    self.completion_tokens += COMPLETION_EMA_ALPHA * (completion_tokens - self.completion_tokens)
+            self._cond.notify_all()
+
+    def rate_limited(self, headers: Mapping[str, str]) -> float:
+        """Pause all calls after 429, return pause in seconds"""
+        pause = (
+            parse_duration(headers.get("retry-after"))
+            or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            or parse_duration(headers.get("x-ratelimit-reset-requests"))
+            or 1.0
+        )
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            self.requests.available = min(self.requests.available, 0)
+        logger.warning(f"LLM rate limit exceeded, pausing for {pause:.1f}s")
+        return pause
+
+    @property
+    def headroom(self) -> float:
+        """Share of the tighter limit left right now, 0..1"""
+        with self._cond:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return min(self.requests.headroom, self.tokens.headroom)
+
+
+_limiters: dict[tuple, RateLimiter] = {}
+_limiters_lock = Lock()
+
+
+def get_rate_limiter(provider: str, api_key: str | None) -> RateLimiter:
+    """Limits belong to the account, so clients with the same key share a limiter"""
+    key = (provider, api_key)
+    with _limiters_lock:
+        if (limiter := _limiters.get(key)) is None:
+            limiter = _limiters[key] = RateLimiter()
+        return limiter
@@ -0,0 +1,150 @@
+import logging
+import time
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Any, Callable, List, Sequence
+
+from src.ai.base import BaseLLM, LLMError
+
+logger = logging.getLogger(__package__)
+
+# Weight of the last call in average latency
+LATENCY_EMA_ALPHA = 0.3
+# Backend is skipped after failure for this long, doubled on every failure in a row
+FAILURE_COOLDOWN = 5.0
+MAX_FAILURE_COOLDOWN = 300.0
+
+
+@dataclass
+class BackendStats:
+    calls: int = 0
+    in_flight: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    # Average latency of successful calls, seconds
+    latency: float | None = None
+    cooldown_until: float = 0.0
+
+
+@dataclass
+class Backend:
+    name: str
+    llm: BaseLLM
+    stats: BackendStats
+
+    @property
+    def headroom(self) -> float:
+        # Cache wrapper hides provider client
+        llm = getattr(self.llm, "llm", self.llm)
+        limiter = getattr(llm, "rate_limiter", None)
+        return limiter.headroom if limiter is not None else 1.0
+
+
+class LLMRouter(BaseLLM):
+    """
+    Spreads calls of one task over several (provider, model, key) backends.
+    A backend is chosen by remaining rate limit headroom and observed latency,
+    on error the call fails over to the next one and the failed backend cools down for a while.
+    """
+
+    def __init__(self, backends: Sequence[tuple[str, BaseLLM]]):
+        if not backends:
+            raise LLMError("No LLM backends configured")
+        primary = backends[0][1]
+        super().__init__(
+            replace(primary.cfg, max_concurrency=sum(llm.cfg.max_concurrency for _, llm in backends)),
+            primary.prompts,
+        )
+        self.backends = [Backend(name, llm, BackendStats()) for name, llm in backends]
+        self._lock = Lock()
+
+    def _score(self, backend: Backend) -> float:
+        # Backends without calls yet are tried with the best known latency
+        known = [b.stats.latency for b in self.backends if b.stats.latency is not None]
+        latency = backend.stats.latency if backend.stats.latency is not None else min(known, default=1.0)
+        return backend.headroom / (max(latency, 0.001) * (1 + backend.stats.in_flight))
+
+    def _ordered(self) -> List[Backend]:
+        now = time.monotonic()
+        with self._lock:
+            ready = [b for b in self.backends if b.stats.cooldown_until <= now]
+            cooling = sorted(
+                (b for b in self.backends if b.stats.cooldown_until > now), key=lambda b: b.stats.cooldown_until
+            )
+            ready.sort(key=self._score, reverse=True)
+        # Cooling down backends are the last resort
+        return ready + cooling
+
+    def _record(self, backend: Backend, started_at: float, failed: bool) -> None:
+        stats = backend.stats
+        with self._lock:
+            stats.calls += 1
+            stats.in_flight -= 1
+            if failed:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                cooldown = min(MAX_FAILURE_COOLDOWN, FAILURE_COOLDOWN * 2 ** (stats.consecutive_failures - 1))
+                stats.cooldown_until = time.monotonic() + cooldown
+                return
+
+            elapsed = time.monotonic() - started_at
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+            if stats.latency is None:
+                stats.latency = elapsed
+            else:
+                stats.latency += LATENCY_EMA_ALPHA * (elapsed - stats.latency)
+
+    def _call(self, send: Callable[[BaseLLM], str], can_fail_over: Callable[[], bool] = lambda: True) -> str:
+        last_error: LLMError | None = None
+        for backend in self._ordered():
+            started_at = time.monotonic()
+            with self._lock:
+                backend.stats.in_flight += 1
+            try:
+                response = send(backend.llm)
+            except LLMError as ex:
+                self._record(backend, started_at, failed=True)
+                logger.warning(f"LLM backend {backend.name} failed: {ex}")
+                last_error = ex
+                if not can_fail_over():
+                    raise
+                continue
+
+            self._record(backend, started_at, failed=False)
+            return response
+
+        assert last_error is not None
+        raise last_error
+
+    def send_message(self, user_message: str, *args: Any, **kwargs: Any) -> str:
+        return self._call(lambda llm: llm.send_message(user_message, *args, **kwargs))
+
+    def stream_message(
+        self, user_message: str, on_token: Callable[[str], None] | None = None, verify_tag_end: bool = False
+    ) -> str:
+        emitted = False
+
+        def emit(token: str) -> None:
+            nonlocal emitted
+            emitted = True
+            if on_token is not None:
+                on_token(token)
+
+        # Once part of the answer is shown, another backend would start it over
+        return self._call(
+            lambda llm: llm.stream_message(user_message, on_token=emit, verify_tag_end=verify_tag_end),
+            can_fail_over=lambda: not emitted,
+        )
+
+    def fresh(self) -> "LLMRouter":
+        router = LLMRouter([(b.name, b.llm.fresh()) for b in self.backends])
+        # Stats and cooldowns are shared with the cached view
+        for backend, own in zip(router.backends, self.backends):
+            backend.stats = own.stats
+        router._lock = self._lock
+        return router
+
+    def stats(self) -> dict[str, BackendStats]:
+        with self._lock:
+            return {b.name: replace(b.stats) for b in self.backends}
@@ -1,3 +1,6 @@
+from pathlib import Path
+from typing import Sequence
+
 from ai import LLMFactory
 from ai.base import ModelConfig, Prompts
 from config import Candidate, LLMOptions, LLMPrompts
@@ -11,13 +14,37 @@ def get_prompts(cfg_prompts: LLMPrompts, candidate_info: Candidate | None = None
     return Prompts(system_prompt)
 
 
-def get_chat(prompts: Prompts, options: LLMOptions):
-    cfg = ModelConfig(
+def get_model_config(options: LLMOptions) -> ModelConfig:
+    return ModelConfig(
         options.model_name,
         options.api_key,
         options.temperature,
         options.max_tokens,
         options.top_p,
+        options.max_concurrency,
+        options.cache,
+        options.base_url,
+        options.latency_ms,
+        options.tokens_per_second,
+        options.timeout,
     )
 
-    return LLMFactory.create(options.provider, cfg, prompts)
+
+def get_chat(
+    prompts: Prompts,
+    options: LLMOptions,
+    backends: Sequence[LLMOptions] = (),
+    interactive: bool = False,
+    data_path: str | Path | None = None,
+):
+    """
+    Chat for task options, additional backends are load balanced with failover.
+    Interactive chats hedge slow requests if enabled in options.
+    Responses are cached in `data_path` (--data-path), default config dir if not set.
+    """
+    return LLMFactory.get_router(
+        [(o.provider, get_model_config(o)) for o in (options, *backends)],
+        prompts,
+        hedge=interactive and options.hedge,
+        data_path=data_path,
+    )
@@ -53,6 +53,7 @@ class BaseClient:
 
     def __post_init__(self) -> None:
         self.lock = Lock()
+        self.in_flight = 0
         if not self.session:
             self.session = session = requests.session()
             session.headers.update(
@@ -90,10 +91,17 @@ class BaseClient:
         params = dict(params or {})
         params.update(kwargs)
         url = self.resolve_url(endpoint)
+        # Only the start slot is reserved under lock, so requests from several threads
+        # may be in flight at the same time. Sequential requests are spaced by `delay` from
+        # the end of the previous response, concurrent ones by `delay` between their starts.
         with self.lock:
-            if (delay := (self.delay if delay is None else delay) - time.monotonic() + self.previous_request_time) > 0:
-                logger.debug("wait %fs before request", delay)
-                time.sleep(delay)
+            start_at = max(time.monotonic(), self.previous_request_time + (self.delay if delay is None else delay))
+            self.previous_request_time = start_at
+            self.in_flight += 1
+        try:
+            if (wait := start_at - time.monotonic()) > 0:
+                logger.debug("wait %fs before request", wait)
+                time.sleep(wait)
             has_body = method in ["POST", "PUT"]
             payload = {"data" if has_body else "params": params}
             response = self.session.request(  # pyright: ignore[reportOptionalMemberAccess]
@@ -103,19 +111,23 @@ class BaseClient:
                 proxies=self.proxies,
                 allow_redirects=False,
             )
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                if not self.in_flight:
+                    self.previous_request_time = max(self.previous_request_time, time.monotonic())
+        try:
             try:
-                try:
-                    rv = response.json()
-                except json.decoder.JSONDecodeError:
-                    rv = {}
-            finally:
-                logger.debug(
-                    "%d %-6s %s",
-                    response.status_code,
-                    method,
-                    url + ("?" + urlencode(params) if not has_body and params else ""),
-                )
-                self.previous_request_time = time.monotonic()
+                rv = response.json()
+            except json.decoder.JSONDecodeError:
+                rv = {}
+        finally:
+            logger.debug(
+                "%d %-6s %s",
+                response.status_code,
+                method,
+                url + ("?" + urlencode(params) if not has_body and params else ""),
+            )
         self.raise_for_status(response, rv)
         assert 300 > response.status_code >= 200
         return rv
@@ -212,6 +224,7 @@ class ApiClient(BaseClient):
 
     def __post_init__(self):
         super().__post_init__()
+        self.refresh_lock = Lock()
 
     @property
     def is_access_expired(self) -> bool:
@@ -241,13 +254,17 @@ class ApiClient(BaseClient):
         def do_request():
             return BaseClient.request(self, method, endpoint, params, delay, **kwargs)
 
+        access_token = self.access_token
         try:
             return do_request()
         except errors.Forbidden as ex:
-            if not self.is_access_expired or not self.refresh_token:
-                raise ex
-            logger.info("try refresh access_token")
-            self.refresh_access_token()
+            # Refresh token is rotated on use, so only one of the threads that got 403 refreshes it
+            with self.refresh_lock:
+                if self.access_token == access_token:
+                    if not self.is_access_expired or not self.refresh_token:
+                        raise ex
+                    logger.info("try refresh access_token")
+                    self.refresh_access_token()
             return do_request()
 
     def handle_access_token(self, token: AccessToken) -> None:
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields, is_dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Optional, Union, get_type_hints
+from threading import Lock
+from typing import Any, Callable, Optional, Union, get_type_hints
 
 import tomllib
 from tomli_w import dump as toml_dump
@@ -42,6 +44,19 @@ class LLMOptions:
     max_tokens: int = 1000
     top_p: float = 0.9
     api_key: Optional[str] = None
+    max_concurrency: int = 4
+    cache: bool = True
+    # OpenAI-compatible endpoint instead of provider's default one
+    base_url: Optional[str] = None
+    # Local provider only: first token delay interval and generation rate
+    latency_ms: str = "0"
+    tokens_per_second: float = 0.0
+    # Max tokens of vacancy description in cover letter prompt, 0 - no limit
+    prompt_budget: int = 800
+    # Deadline of one call, seconds, 0 - provider default
+    timeout: float = 60.0
+    # Duplicate slow interactive requests (chat replies), batch calls are never hedged
+    hedge: bool = True
 
 
 @dataclass
@@ -57,6 +72,8 @@ class CoverLettersMessages:
 @dataclass
 class CoverLetters:
     options: LLMOptions = field(default_factory=LLMOptions)
+    # Additional backends to balance load and fail over to
+    backends: list[LLMOptions] = field(default_factory=list)
     prompts: LLMPrompts = field(default_factory=LLMPrompts)
     messages: CoverLettersMessages = field(default_factory=CoverLettersMessages)
 
@@ -64,18 +81,24 @@ class CoverLetters:
 @dataclass
 class VerifyRelevance:
     options: LLMOptions = field(default_factory=LLMOptions)
+    # Additional backends to balance load and fail over to
+    backends: list[LLMOptions] = field(default_factory=list)
     prompts: LLMPrompts = field(default_factory=LLMPrompts)
 
 
 @dataclass
 class ChatReply:
     options: LLMOptions = field(default_factory=LLMOptions)
+    # Additional backends to balance load and fail over to
+    backends: list[LLMOptions] = field(default_factory=list)
     prompts: LLMPrompts = field(default_factory=LLMPrompts)
 
 
 @dataclass
 class ResumeBuilder:
     options: LLMOptions = field(default_factory=LLMOptions)
+    # Additional backends to balance load and fail over to
+    backends: list[LLMOptions] = field(default_factory=list)
     prompts: LLMPrompts = field(default_factory=LLMPrompts)
 
 
@@ -96,42 +119,29 @@ class Config:
 
     @classmethod
     def load(cls, config_path: str | Path = "config/config.toml") -> Config:
-        config_path = Path(config_path)
-        if not config_path.exists():
-            raise FileNotFoundError(f"{config_path} does not exist")
+        """
+        Return config parsed from file. Parsed config is cached per file until its mtime or size changes,
+        so repeated calls are cheap and edits are picked up by the next call.
+        """
+        config_path = Path(config_path).resolve()
+        try:
+            stat = config_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{config_path} does not exist") from None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        with _cache_lock:
+            cached = _cache.get(config_path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
 
         with config_path.open("rb") as f:
             data = tomllib.load(f)
 
-        def to_dc(cls_type, d: dict[str, Any]):
-            if not is_dataclass(cls_type):
-                return d
-
-            kwargs = {}
-            hints = get_type_hints(cls_type)  # resolves forward refs
-            for f in fields(cls_type):
-                name = f.name
-                if name not in d:
-                    continue
-                value = d[name]
-                f_type = hints.get(name, f.type)
-
-                # unwrap Optional[T]
-                origin = getattr(f_type, "__origin__", None)
-                args = getattr(f_type, "__args__", ())
-                if origin is Union and type(None) in args:
-                    non_none = [a for a in args if a is not type(None)]
-                    if non_none:
-                        f_type = non_none[0]
-
-                if is_dataclass(f_type) and isinstance(value, dict):
-                    kwargs[name] = to_dc(f_type, value)
-                else:
-                    kwargs[name] = value
-
-            return cls_type(**kwargs)  # type: ignore
-
-        return to_dc(cls, data)  # type: ignore
+        config = _get_converter(cls)(data)
+        with _cache_lock:
+            _cache[config_path] = (version, config)
+        return config
 
     def update(self, path: str, value: Any):
         parts = path.split(".")
@@ -143,7 +153,10 @@ class Config:
     def save(self, config_path: str | Path = "config/config.toml"):
         def dc_to_dict(obj):
             if is_dataclass(obj):
-                return {f.name: dc_to_dict(getattr(obj, f.name)) for f in fields(obj)}
+                # TOML has no null, unset optional values are left out
+                return {
+                    f.name: dc_to_dict(value) for f in fields(obj) if (value := getattr(obj, f.name)) is not None
+                }
             elif isinstance(obj, (list, tuple)):
                 return [dc_to_dict(x) for x in obj]
             else:
@@ -153,3 +166,50 @@ class Config:
         config_path.parent.mkdir(parents=True, exist_ok=True)
         with config_path.open("wb") as f:
             toml_dump(dc_to_dict(self), f)
+
+        # Saved config is the current version of the file
+        stat = config_path.stat()
+        with _cache_lock:
+            _cache[config_path.resolve()] = ((stat.st_mtime_ns, stat.st_size), self)
+
+
+# Parsed configs by resolved path with (mtime, size) of the file they were parsed from
+_cache: dict[Path, tuple[tuple[int, int], Config]] = {}
+_cache_lock = Lock()
+
+
+@lru_cache(maxsize=None)
+def _get_converter(cls_type: type) -> Callable[[dict[str, Any]], Any]:
+    """
+    Build dict -> dataclass converter once per dataclass.
+    Type hints are resolved here, so a load only walks the data.
+    """
+    hints = get_type_hints(cls_type)  # resolves forward refs
+    converters: list[tuple[str, Callable[[Any], Any]]] = []
+    for f in fields(cls_type):
+        f_type = hints.get(f.name, f.type)
+
+        # unwrap Optional[T]
+        origin = getattr(f_type, "__origin__", None)
+        args = getattr(f_type, "__args__", ())
+        if origin is Union and type(None) in args:
+            non_none = [a for a in args if a is not type(None)]
+            if non_none:
+                f_type = non_none[0]
+
+        converters.append((f.name, _field_converter(f_type, origin, args)))
+
+    def convert(d: dict[str, Any]) -> Any:
+        return cls_type(**{name: conv(d[name]) for name, conv in converters if name in d})
+
+    return convert
+
+
+def _field_converter(f_type: Any, origin: Any, args: tuple[Any, ...]) -> Callable[[Any], Any]:
+    if is_dataclass(f_type):
+        nested = _get_converter(f_type)
+        return lambda value: nested(value) if isinstance(value, dict) else value
+    if origin is list and args and is_dataclass(args[0]):
+        item = _get_converter(args[0])
+        return lambda value: [item(x) for x in value] if isinstance(value, list) else value
+    return lambda value: value
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import ast
 import logging
 import sys
+from functools import partial
 from importlib import import_module
 from os import getenv
 from pathlib import Path
 from pkgutil import iter_modules
-from typing import Literal, Sequence
+from typing import Callable, Literal, Sequence
 
 from src.api import HHApi
 from src.argparse import CustomHelpFormatter
@@ -28,6 +30,42 @@ class BaseOperation:
 OPERATIONS = "operations"
 
 
+class LazySubParsersAction(argparse._SubParsersAction):
+    """Sets up parser of a command only when the command is chosen"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._loaders: dict[str, Callable[[argparse.ArgumentParser], None]] = {}
+
+    def add_lazy_parser(
+        self, name: str, loader: Callable[[argparse.ArgumentParser], None], **kwargs
+    ) -> argparse.ArgumentParser:
+        parser = self.add_parser(name, **kwargs)
+        self._loaders[name] = loader
+        return parser
+
+    def __call__(self, parser, namespace, values, option_string=None) -> None:
+        if (loader := self._loaders.pop(values[0], None)) is not None:
+            loader(self._name_parser_map[values[0]])
+        super().__call__(parser, namespace, values, option_string)
+
+
+def get_operation_help(path: Path) -> str:
+    """Docstring of `Operation` class read from module source, without importing the module"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == "Operation":
+            return (ast.get_docstring(node) or "").strip()
+    return ""
+
+
+def load_operation(module_name: str, parser: argparse.ArgumentParser) -> None:
+    mod = import_module(f"{__package__}.{OPERATIONS}.{module_name}")
+    op: BaseOperation = mod.Operation()
+    parser.set_defaults(run=op.run)
+    op.setup_parser(parser)
+
+
 class Namespace(argparse.Namespace):
     data: Data
     config_path: str
@@ -90,20 +128,20 @@ class HHApplicantTool:
         group.add_argument("--user-agent", type=str, help="User-Agent для каждого запроса")
         group.add_argument("--proxy-url", type=str, help="Прокси, используемый для запросов к API")
 
-        subparsers = parser.add_subparsers(help="commands", dest="command", metavar="")
+        subparsers = parser.add_subparsers(
+            help="commands", dest="command", metavar="", action=LazySubParsersAction
+        )
 
+        # Operation modules pull in heavy dependencies, only the chosen one is imported
         package_dir = Path(__file__).resolve().parent / OPERATIONS
-        for _, module_name, _ in iter_modules([str(package_dir)]):
-            mod = import_module(f"{__package__}.{OPERATIONS}.{module_name}")
-            op: BaseOperation = mod.Operation()
-
-            op_parser = subparsers.add_parser(
+        for _, module_name, is_pkg in iter_modules([str(package_dir)]):
+            path = package_dir / module_name / "__init__.py" if is_pkg else package_dir / f"{module_name}.py"
+            subparsers.add_lazy_parser(
                 module_name.replace("_", "-"),
-                help=(op.__doc__.strip() if op.__doc__ else ""),
+                partial(load_operation, module_name),
+                help=get_operation_help(path),
                 formatter_class=CustomHelpFormatter,
             )
-            op_parser.set_defaults(run=op.run)
-            op.setup_parser(op_parser)
 
         return parser
 
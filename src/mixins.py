@@ -1,5 +1,9 @@
+from itertools import count
+from pathlib import Path
+
 from api import ApiError
 from api.client import HHApi
+from utils import BlacklistedEmployersDB
 
 
 def get_resume_id(api_client: HHApi) -> str:
@@ -8,3 +12,22 @@ def get_resume_id(api_client: HHApi) -> str:
         return str(resumes.items[0].id)
     except (ApiError, KeyError, IndexError) as ex:
         raise Exception("Не могу получить идентификатор резюме") from ex
+
+
+def get_blacklisted_employers(api_client: HHApi, config_path: str | Path | None = None) -> BlacklistedEmployersDB:
+    """Return local blacklist, re-download it only if total count on HH differs from local one"""
+    db = BlacklistedEmployersDB(config_path)
+    # In this api method pages count from 0
+    r = api_client.blacklisted_employers.get(page=0)
+    if db.is_synced(r.found):
+        return db
+
+    ids = [item.id for item in r.items]
+    for page in count(1):
+        if page >= r.pages:
+            break
+        r = api_client.blacklisted_employers.get(page=page)
+        ids += [item.id for item in r.items]
+
+    db.replace(ids, r.found)
+    return db
@@ -1,44 +1,108 @@
 import logging
 import random
 import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import List
 
+import requests
+
 from ai.utils import get_chat, get_prompts
 from api import ApiError, HHApi
 from api.errors import LimitExceeded
 from api.hh_api.schemas.vacancies import VacancyItem
+from api.hh_api.schemas.vacancy import VacancyFull
 from config import DefaultCoverLetter
-from mixins import get_resume_id
+from constants import INVALID_ISO8601_FORMAT
+from mixins import get_blacklisted_employers, get_resume_id
 from operations.apply_similar.utils.negotiations import (
     NegotiationsLLM,
     NegotiationsLocal,
 )
+from operations.apply_similar.utils.prompt_budget import PromptCompressor
+from operations.apply_similar.utils.ranking import VacancyRanker
+from operations.apply_similar.utils.text_prep import PreparedText, TextPreparePool
 from operations.apply_similar.utils.vacancy_relevance import VacancyRelevanceLLM
 from src.config import Config
 from src.operations.apply_similar import base
-from utils import BlockedVacanciesDB, truncate_string
+from utils import BlockedVacanciesDB, Data, truncate_string
 
 logger = logging.getLogger(__package__)
 
+# Vacancies are indexed with a delay, so each watch cycle overlaps with previous one
+WATCH_OVERLAP_SECONDS = 300
+
+# Number of vacancies verified by LLM concurrently ahead of applying
+RELEVANCE_BATCH_SIZE = 10
+# Number of vacancy descriptions prepared for LLM in worker processes ahead of applying
+PREPARE_BATCH_SIZE = 50
+
 
 class Operation(base.OperationBase):
     """Reply to all relevant vacancies."""
 
+    def __init__(self) -> None:
+        self.relevance_verdicts: dict[str, bool] = {}
+        self.prepared: dict[str, tuple[VacancyFull, PreparedText]] = {}
+
     def run(self, args: base.Namespace, api_client: HHApi) -> None:
         self.args: base.Namespace = args
-        self.config = Config.load(args.config_path)
+        # Lives across config reloads to keep employers boilerplate seen so far
+        self.prompt_compressor = PromptCompressor()
+        self._load_config()
 
         self.api_client = api_client
         self.resume_id = args.resume_id or get_resume_id(api_client)
+        self.blacklisted = get_blacklisted_employers(api_client, args.data_path)
+
+        self.apply_min_interval, self.apply_max_interval = args.apply_interval
+        self.page_min_interval, self.page_max_interval = args.page_interval
+        self.search_all_vacancies = args.search_all
+        self.limit_exceeded = False
+
+        self.text_pool = (
+            TextPreparePool(args.prepare_workers) if args.use_ai and args.prepare_workers > 0 else None
+        )
+        try:
+            if args.watch:
+                self._watch()
+            elif args.rank:
+                self._apply_ranked()
+            else:
+                self._apply_similar()
+        finally:
+            if self.text_pool is not None:
+                self.text_pool.close()
+            self._report_prompt_budget()
+
+    def _report_prompt_budget(self) -> None:
+        compressor = self.prompt_compressor
+        if not compressor.tokens_before:
+            return
+        logger.info(f"Prompt tokens: {compressor.tokens_before} -> {compressor.tokens_after}")
+        print(
+            f"✂️ Описания вакансий для ИИ сокращены на {compressor.tokens_saved} токенов "
+            f"({compressor.tokens_before} → {compressor.tokens_after})"
+        )
+
+    def _load_config(self) -> None:
+        """Load config and build message generators, called again in watch mode when config changes"""
+        self.config = Config.load(self.args.config_path)
 
         if self.args.use_ai:
             prompts = get_prompts(self.config.llm.cover_letters.prompts, self.config.candidate)
             negotiations_chat = get_chat(
                 prompts,
                 self.config.llm.cover_letters.options,
+                self.config.llm.cover_letters.backends,
+                data_path=self.args.data_path,
             )
 
-            self.negotiations_llm = NegotiationsLLM(negotiations_chat)
+            self.negotiations_llm = NegotiationsLLM(
+                negotiations_chat,
+                self.prompt_compressor,
+                self.config.llm.cover_letters.options.prompt_budget,
+            )
         else:
             messages_list: DefaultCoverLetter = self.config.default_messages.cover_letter
             self.negotiations_chat = NegotiationsLocal(messages_list)
@@ -49,30 +113,163 @@ class Operation(base.OperationBase):
             vacancy_relevance_chat = get_chat(
                 prompts,
                 self.config.llm.verify_relevance.options,
+                self.config.llm.verify_relevance.backends,
+                data_path=self.args.data_path,
             )
             self.vacancy_relevance_llm = VacancyRelevanceLLM(vacancy_relevance_chat)
 
-        self.apply_min_interval, self.apply_max_interval = args.apply_interval
-        self.page_min_interval, self.page_max_interval = args.page_interval
-        self.search_all_vacancies = args.search_all
+    def _config_mtime(self) -> float | None:
+        try:
+            return Path(self.args.config_path).stat().st_mtime
+        except OSError:
+            return None
+
+    def _watch(self) -> None:
+        """
+        Poll for new vacancies and apply as they appear.
+        Api client, resume id and llm clients stay warm between cycles,
+        after the first full search only vacancies published since the last cycle are requested.
+        """
+        watch_min_interval, watch_max_interval = self.args.watch_interval
+        seen: set[str] = set()
+        date_from: str | None = self.args.date_from
+        config_mtime = self._config_mtime()
+        cycle = 0
 
-        self._apply_similar()
+        print("👀 Следим за новыми вакансиями, Ctrl+C для выхода")
+        try:
+            while True:
+                cycle_started_at = datetime.now(timezone.utc) - timedelta(seconds=WATCH_OVERLAP_SECONDS)
+                try:
+                    if (mtime := self._config_mtime()) != config_mtime:
+                        logger.info("Config file changed, reloading")
+                        config_mtime = mtime
+                        self._load_config()
+
+                    vacancies = self._get_vacancies(search_all_vacancies=self.search_all_vacancies, date_from=date_from)
+                    new_vacancies = [v for v in vacancies if v.id not in seen]
+                    logger.info(f"Watch cycle {cycle}: {len(vacancies)} vacancies, {len(new_vacancies)} new")
+
+                    self.limit_exceeded = False
+                    self._apply_vacancies(new_vacancies, seen)
+                    if not self.limit_exceeded:
+                        # Vacancies left after limit are requested again next cycle
+                        date_from = cycle_started_at.strftime(INVALID_ISO8601_FORMAT)
+                except (ApiError, requests.RequestException) as ex:
+                    # Network errors are transient, the daemon keeps polling
+                    logger.error(ex)
+                finally:
+                    self._save_token()
+
+                cycle += 1
+                time.sleep(random.uniform(watch_min_interval, watch_max_interval))
+        except KeyboardInterrupt:
+            print("👋 Наблюдение остановлено")
+
+    def _save_token(self) -> None:
+        """Persist refreshed token, refresh token is single use and the daemon may be killed at any moment"""
+        data = Data(self.args.data_path)
+        if (token := self.api_client.get_access_token()) != data.get("token"):
+            data.save(token=token)
+
+    def _apply_ranked(self) -> None:
+        """Fetch and score the whole candidate set, then apply to the best matches up to quota"""
+        logger.info("Fetching vacancies")
+        vacancies = self._get_vacancies(search_all_vacancies=self.search_all_vacancies)
+        logger.info(f"Ranking {len(vacancies)} vacancies")
+
+        ranker = VacancyRanker(self.config.candidate.info, self.args.salary)
+        blocked = BlockedVacanciesDB().blocked if self.args.block_irrelevant else set()
+        ranked = ranker.rank(vacancies, blocked=blocked)
+
+        max_applies = self.args.max_applies
+        applied = 0
+        for item in ranked:
+            if max_applies is not None and applied >= max_applies:
+                logger.info("Reached max applies for this run")
+                break
+            if self.limit_exceeded:
+                break
+
+            logger.debug(f"Score {item.score:.3f} for vacancy {item.vacancy.alternate_url}")
+            if self._apply_vacancy(item.vacancy):
+                applied += 1
+
+        print(f"📝 Отклики на вакансии разосланы! Отправлено: {applied}")
 
     def _apply_similar(self) -> None:
         logger.info("Fetching vacancies")
         vacancies = self._get_vacancies(search_all_vacancies=self.search_all_vacancies)
         logger.info("Got list of vacancies")
-        for vacancy in vacancies:
-            if self.args.block_irrelevant:
-                db = BlockedVacanciesDB()
-                if db.is_in_list(vacancy.id):
-                    print(f"Skipping vacancy cause it is in blocked list: {vacancy.name}")
-                    continue
+        self._apply_vacancies(vacancies)
+
+        print("📝 Отклики на вакансии разосланы!")
+
+    def _apply_vacancies(self, vacancies: List[VacancyItem], seen: set[str] | None = None) -> None:
+        """Apply to vacancies in order, `seen` collects ids of processed ones (watch mode)"""
+        self.prepared.clear()
+        # Descriptions are prefetched only for vacancies with a known relevance verdict
+        prepare_batch_size = RELEVANCE_BATCH_SIZE if self.args.verify_relevance else PREPARE_BATCH_SIZE
+        for i, vacancy in enumerate(vacancies):
+            if self.limit_exceeded:
+                break
+            if self.args.verify_relevance and i % RELEVANCE_BATCH_SIZE == 0:
+                self._verify_relevance_batch(vacancies[i : i + RELEVANCE_BATCH_SIZE])
+            if self.text_pool is not None and i % prepare_batch_size == 0:
+                self._prepare_batch(vacancies[i : i + prepare_batch_size])
+
+            if self._is_blocked(vacancy):
+                print(f"Skipping vacancy cause it is in blocked list: {vacancy.name}")
+                continue
 
             logger.info("Applying to vacancy")
             self._apply_vacancy(vacancy)
-
-        print("📝 Отклики на вакансии разосланы!")
+            if seen is not None and not self.limit_exceeded:
+                seen.add(vacancy.id)
+
+    def _is_blocked(self, vacancy: VacancyItem) -> bool:
+        return bool(self.args.block_irrelevant) and BlockedVacanciesDB().is_in_list(vacancy.id)
+
+    def _verify_relevance_batch(self, vacancies: List[VacancyItem]) -> None:
+        """Verify relevance of the next vacancies concurrently, verdicts are used by `_apply_vacancy`"""
+        candidates = [
+            v for v in vacancies if not (v.has_test or v.archived or v.relations or self._is_blocked(v))
+        ]
+        if not candidates:
+            return
+        verdicts = self.vacancy_relevance_llm.verify_many(candidates)
+        self.relevance_verdicts.update(zip((v.id for v in candidates), verdicts))
+
+    def _prepare_batch(self, vacancies: List[VacancyItem]) -> None:
+        """
+        Fetch full vacancies that will need a cover letter and prepare their descriptions in worker processes,
+        results are used by `_send_apply`
+        """
+        assert self.text_pool is not None
+        ids: List[str] = []
+        fulls: List[VacancyFull] = []
+        for vacancy in vacancies:
+            if self.limit_exceeded:
+                break
+            if vacancy.has_test or vacancy.archived or vacancy.relations or self._is_blocked(vacancy):
+                continue
+            if self.relevance_verdicts.get(vacancy.id) is False:
+                continue
+            if not (self.args.force_message or vacancy.response_letter_required):
+                continue
+            try:
+                fulls.append(self.api_client.vacancy.get(vacancy.id))
+            except ApiError as ex:
+                logger.error(ex)
+                continue
+            ids.append(vacancy.id)
+
+        if not fulls:
+            return
+        started = time.perf_counter()
+        prepared = self.text_pool.prepare([vacancy_full.description for vacancy_full in fulls])
+        logger.debug(f"Prepared {len(fulls)} descriptions in {time.perf_counter() - started:.2f}s")
+        self.prepared.update(zip(ids, zip(fulls, prepared)))
 
     def _apply_vacancy(self, vacancy: VacancyItem) -> bool:
         """
@@ -95,7 +292,9 @@ class Operation(base.OperationBase):
             logger.debug(f"Пропускаем вакансию с откликом: {vacancy.alternate_url}")
             return False
         if self.args.verify_relevance:
-            relevance_result = self.vacancy_relevance_llm.verify(vacancy)
+            relevance_result = self.relevance_verdicts.pop(vacancy.id, None)
+            if relevance_result is None:
+                relevance_result = self.vacancy_relevance_llm.verify(vacancy)
             if not relevance_result:
                 print(
                     "Skipping vacancy cause it is not relevant to candidate: ",
@@ -108,16 +307,16 @@ class Operation(base.OperationBase):
 
                 return False
         try:
-            self._send_apply(vacancy)
-            return True
+            return self._send_apply(vacancy)
         except LimitExceeded:
             print("⚠️ Достигли лимита рассылки")
+            self.limit_exceeded = True
             return False
         except ApiError as ex:
             logger.error(ex)
             return False
 
-    def _send_apply(self, vacancy: VacancyItem):
+    def _send_apply(self, vacancy: VacancyItem) -> bool:
         """
         Generates cover letter for vacancy(if needed) and send the apply
         """
@@ -129,11 +328,15 @@ class Operation(base.OperationBase):
 
         if self.args.force_message or vacancy.response_letter_required:
             if self.args.use_ai:
-                vacancy_full = self.api_client.vacancy.get(vacancy.id)
+                vacancy_full, prepared = self.prepared.pop(vacancy.id, (None, None))
+                if vacancy_full is None:
+                    vacancy_full = self.api_client.vacancy.get(vacancy.id)
 
-                msg = self.negotiations_llm.get_msg(vacancy_full, self.config.llm.cover_letters.messages.footer_msg)
+                msg = self.negotiations_llm.get_msg(
+                    vacancy_full, self.config.llm.cover_letters.messages.footer_msg, prepared
+                )
                 if not msg:  # llm dropped error
-                    return
+                    return False
             else:
                 me_info = self.api_client.me.get()
 
@@ -154,18 +357,23 @@ class Operation(base.OperationBase):
             truncate_string(vacancy.name),
             ")",
         )
+        return True
 
-    def _get_vacancies(self, per_page: int = 100, search_all_vacancies=False) -> List[VacancyItem]:
+    def _get_vacancies(
+        self, per_page: int = 100, search_all_vacancies=False, date_from: str | None = None
+    ) -> List[VacancyItem]:
         rv = []
         # API gives only 2 000 items
         for page in range(20):
             params = self._get_search_params(self.args, page, per_page)
+            if date_from:
+                params["date_from"] = date_from
             if search_all_vacancies:
                 vacancies = self.api_client.all_vacancies.get(params)
             else:
                 vacancies = self.api_client.similar_vacancies.get(self.resume_id, params)
 
-            rv.extend(vacancies.items)
+            rv.extend(v for v in vacancies.items if v.employer.id not in self.blacklisted)
             if page >= vacancies.pages - 1:
                 break
 
@@ -52,6 +52,11 @@ class Namespace(BaseNamespace):
     clusters: bool
     work_format_remote: bool
     search_all: bool
+    rank: bool
+    max_applies: int | None
+    watch: bool
+    watch_interval: tuple[float, float]
+    prepare_workers: int
 
 
 def _bool(v: bool) -> str:
@@ -195,6 +200,35 @@ class OperationBase(BaseOperation):
             action=argparse.BooleanOptionalAction,
             help="Искать все вакансии",
         )
+        parser.add_argument(
+            "--rank",
+            default=False,
+            action=argparse.BooleanOptionalAction,
+            help="Сначала получить и оценить все вакансии, затем откликаться в порядке убывания релевантности",
+        )
+        parser.add_argument(
+            "--max-applies",
+            type=int,
+            help="Максимальное количество откликов за запуск (оставшийся дневной лимит)",
+        )
+        parser.add_argument(
+            "--watch",
+            default=False,
+            action=argparse.BooleanOptionalAction,
+            help="Не завершаться, а периодически проверять новые вакансии и откликаться на них",
+        )
+        parser.add_argument(
+            "--watch-interval",
+            help="Интервал между проверками новых вакансий в режиме --watch в секундах (X, X-Y)",
+            default="600-900",
+            type=parse_interval,
+        )
+        parser.add_argument(
+            "--prepare-workers",
+            type=int,
+            default=0,
+            help="Число процессов для подготовки описаний вакансий к ИИ (0 — в основном процессе)",
+        )
 
     def _get_search_params(self, args: Namespace, page: int, per_page: int) -> dict:
         params = {
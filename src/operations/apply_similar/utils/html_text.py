@@ -0,0 +1,60 @@
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import List
+
+SKIP_TAGS = frozenset(("script", "style"))
+BLOCK_TAGS = frozenset(("p", "li", "div", "br", "h1", "h2", "h3", "h4"))
+
+# Vacancy descriptions are converted again for every prompt and relevance check
+CACHE_SIZE = 1024
+
+
+class _TextCollector(HTMLParser):
+    """
+    Collects text nodes in one pass without building a tree.
+    Same nodes as BeautifulSoup `get_text()`: script/style content and comments are skipped.
+    With `blocks` a text node is split at block tag boundaries.
+    """
+
+    def __init__(self, blocks: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.blocks = blocks
+        self.chunks: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif self.blocks and tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if self.blocks and tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif self.blocks and tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.chunks.append(data)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def html_to_text(html: str) -> str:
+    parser = _TextCollector()
+    parser.feed(html)
+    parser.close()
+    return " ".join(text for chunk in parser.chunks if (text := chunk.strip()))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def html_to_blocks(html: str) -> tuple[str, ...]:
+    """Text of description split by html blocks (paragraphs, list items, headings)"""
+    parser = _TextCollector(blocks=True)
+    parser.feed(html)
+    parser.close()
+    return tuple(" ".join(line.split()) for line in "".join(parser.chunks).splitlines() if line.strip())
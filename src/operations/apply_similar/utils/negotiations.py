@@ -1,31 +1,31 @@
 import logging
 import random
-from dataclasses import dataclass
-
-from bs4 import BeautifulSoup
+from dataclasses import dataclass, field
 
 from ai.base import BaseLLM, LLMError
 from api.hh_api.schemas.me import MeResponse
 from api.hh_api.schemas.vacancies import VacancyItem
 from api.hh_api.schemas.vacancy import VacancyFull
 from config import DefaultCoverLetter
-from utils import random_text
+from operations.apply_similar.utils.html_text import html_to_text
+from operations.apply_similar.utils.prompt_budget import PromptCompressor
+from operations.apply_similar.utils.text_prep import PreparedText
+from utils import Template, compile_template
 
 logger = logging.getLogger(__package__)
 
 
-def html_to_text(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-
-    for tag in soup(["script", "style"]):
-        tag.extract()
-
-    return soup.get_text(separator=" ", strip=True)
-
-
-def _serialize_for_llm(vacancy: VacancyFull) -> str:
+def _serialize_for_llm(
+    vacancy: VacancyFull,
+    compressor: PromptCompressor | None = None,
+    budget: int = 0,
+    prepared: PreparedText | None = None,
+) -> str:
     key_skills = " ".join([x.name for x in vacancy.key_skills])
-    description = html_to_text(vacancy.description)
+    if compressor is not None:
+        description = compressor.compress(vacancy.description, vacancy.employer.id, budget, prepared)
+    else:
+        description = html_to_text(vacancy.description)
     vacancy_info = {
         "vacancy_name": vacancy.name,
         "employer_name": vacancy.employer.name,
@@ -46,19 +46,22 @@ def _serialize_for_llm(vacancy: VacancyFull) -> str:
 @dataclass
 class NegotiationsLLM:
     chat: BaseLLM
+    compressor: PromptCompressor | None = None
+    # Max tokens of vacancy description in prompt, 0 - no limit
+    prompt_budget: int = 0
 
-    def get_msg(self, vacancy_full: VacancyFull, footer_msg: str = ""):
+    def get_msg(self, vacancy_full: VacancyFull, footer_msg: str = "", prepared: PreparedText | None = None):
         try:
-            return self._get_msg(vacancy_full, footer_msg)
+            return self._get_msg(vacancy_full, footer_msg, prepared)
         except LLMError as ex:
             logger.error(ex)
             return
 
-    def _get_msg(self, vacancy_full: VacancyFull, footer_msg: str = "") -> str:
-        vacancy_info = _serialize_for_llm(vacancy_full)
+    def _get_msg(self, vacancy_full: VacancyFull, footer_msg: str = "", prepared: PreparedText | None = None) -> str:
+        vacancy_info = _serialize_for_llm(vacancy_full, self.compressor, self.prompt_budget, prepared)
         logger.debug(f"AI prompt:\n {vacancy_info}")
 
-        msg = self.chat.send_message(vacancy_info, verify_tag_end=True)
+        msg = self.chat.stream_message(vacancy_info, verify_tag_end=True)
 
         msg += "\n\n" + footer_msg + "\n"
         logger.debug(f"LLM cover letter is: {msg}")
@@ -68,10 +71,12 @@ class NegotiationsLLM:
 @dataclass
 class NegotiationsLocal:
     messages_list: DefaultCoverLetter
+    templates: list[Template] = field(init=False, repr=False)
 
-    def get_msg(self, user_info: MeResponse, vacancy: VacancyItem):
-        msg_template = self._get_msg()
+    def __post_init__(self) -> None:
+        self.templates = [compile_template(msg) for msg in self._get_msg()]
 
+    def get_msg(self, user_info: MeResponse, vacancy: VacancyItem):
         basic_message_placeholders = {
             "first_name": user_info.first_name,
             "last_name": user_info.last_name,
@@ -87,11 +92,11 @@ class NegotiationsLocal:
 
         logger.debug("Вакансия %(vacancy_name)s от %(employer_name)s" % message_placeholders)
 
-        msg = random_text(random.choice(msg_template)) % message_placeholders
+        msg = random.choice(self.templates).render(message_placeholders)
         return msg
 
     def _get_msg(self) -> list[str]:
-        logger.warning(f"local negotiations Msg {self.messages_list.messages}")
+        logger.debug(f"local negotiations Msg {self.messages_list.messages}")
         application_messages = list(filter(None, map(str.strip, self.messages_list.messages)))
 
         return application_messages
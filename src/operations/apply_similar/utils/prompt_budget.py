@@ -0,0 +1,161 @@
+import logging
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import List
+
+from operations.apply_similar.utils.text_prep import PreparedText, prepare_description
+from utils import make_hash
+
+logger = logging.getLogger(__package__)
+
+# Shorter blocks (headings, single words) are never treated as boilerplate
+MIN_BOILERPLATE_TOKENS = 6
+HEADING_MAX_TOKENS = 8
+
+# Section priority: requirements and responsibilities are kept first, company info and benefits last
+PRIORITY_HIGH = 2
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 0
+
+SECTION_KEYWORDS = {
+    PRIORITY_HIGH: (
+        "требован",
+        "обязанност",
+        "задачи",
+        "ожидаем",
+        "необходим",
+        "навык",
+        "предстоит",
+        "чем заниматься",
+        "ждём",
+        "ждем",
+        "стек",
+        "requirements",
+        "responsibilities",
+    ),
+    PRIORITY_LOW: (
+        "условия",
+        "предлагаем",
+        "о компании",
+        "о нас",
+        "мы —",
+        "мы -",
+        "бонус",
+        "льгот",
+        "дмс",
+        "офис",
+        "benefits",
+        "we offer",
+        "about us",
+    ),
+}
+
+
+def _section_priority(heading: str) -> int | None:
+    lowered = heading.lower()
+    for priority, keywords in SECTION_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return priority
+    return None
+
+
+@dataclass
+class _Block:
+    text: str
+    tokens: int
+    priority: int
+    heading: bool
+
+
+@dataclass
+class PromptCompressor:
+    """
+    Fits vacancy description into a token budget before it goes to LLM.
+    - blocks already seen in another vacancy of the same employer are dropped as boilerplate,
+      except headings and requirements/responsibilities that vacancies of one employer often share
+    - then blocks are kept by section priority (requirements and responsibilities first)
+      until the budget is spent, original order is preserved
+    Tokens before and after are summed up for the run report.
+    """
+
+    tokens_before: int = 0
+    tokens_after: int = 0
+    _seen: dict[str, set[str]] = field(default_factory=dict, repr=False)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def compress(
+        self, html: str, employer_id: str | None = None, budget: int = 0, prepared: PreparedText | None = None
+    ) -> str:
+        """`prepared` is the result of `prepare_description(html)` if it was done ahead (e.g. in worker process)"""
+        blocks = self._split(prepared if prepared is not None else prepare_description(html))
+        before = sum(block.tokens for block in blocks)
+
+        blocks = self._dedupe(blocks, employer_id)
+        if budget > 0:
+            blocks = self._trim(blocks, budget)
+
+        text = " ".join(block.text for block in blocks)
+        after = sum(block.tokens for block in blocks)
+        with self._lock:
+            self.tokens_before += before
+            self.tokens_after += after
+        logger.debug(f"Description compressed from {before} to {after} tokens")
+        return text
+
+    def _split(self, prepared: PreparedText) -> List[_Block]:
+        blocks = []
+        priority = PRIORITY_NORMAL
+        for text, tokens in prepared:
+            heading = False
+            if tokens <= HEADING_MAX_TOKENS:
+                if (section := _section_priority(text)) is not None:
+                    priority, heading = section, True
+                elif text.endswith(":"):
+                    priority, heading = PRIORITY_NORMAL, True
+            blocks.append(_Block(text, tokens, priority, heading))
+        return blocks
+
+    def _dedupe(self, blocks: List[_Block], employer_id: str | None) -> List[_Block]:
+        if employer_id is None:
+            return blocks
+
+        hashes = [
+            make_hash(block.text.lower())
+            if block.tokens >= MIN_BOILERPLATE_TOKENS and not block.heading and block.priority != PRIORITY_HIGH
+            else None
+            for block in blocks
+        ]
+        with self._lock:
+            seen = self._seen.setdefault(employer_id, set())
+            rv = [block for block, block_hash in zip(blocks, hashes) if block_hash is None or block_hash not in seen]
+            seen.update(x for x in hashes if x is not None)
+        return rv
+
+    def _trim(self, blocks: List[_Block], budget: int) -> List[_Block]:
+        keep: set[int] = set()
+        spent = 0
+        for priority in (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW):
+            for i, block in enumerate(blocks):
+                if block.priority != priority or block.heading:
+                    continue
+                if spent + block.tokens > budget:
+                    continue
+                keep.add(i)
+                spent += block.tokens
+
+        # Heading is kept only with some of its section content
+        rv = []
+        heading = None
+        for i, block in enumerate(blocks):
+            if block.heading:
+                heading = block
+            elif i in keep:
+                if heading is not None:
+                    rv.append(heading)
+                    heading = None
+                rv.append(block)
+        return rv
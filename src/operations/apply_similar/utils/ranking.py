@@ -0,0 +1,109 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, List
+
+from api.hh_api.schemas.vacancies import VacancyItem
+from utils import parse_invalid_datetime
+
+logger = logging.getLogger(__package__)
+
+WORD_RE = re.compile(r"\w{3,}")
+
+# Age in days at which freshness score drops to one half
+FRESHNESS_HALF_LIFE_DAYS = 7.0
+
+
+def _tokenize(text: str | None) -> set[str]:
+    return set(WORD_RE.findall(text.lower())) if text else set()
+
+
+def _vacancy_tokens(vacancy: VacancyItem) -> set[str]:
+    snippet = vacancy.snippet
+    return (
+        _tokenize(vacancy.name)
+        | _tokenize(snippet.requirement if snippet else None)
+        | _tokenize(snippet.responsibility if snippet else None)
+    )
+
+
+@dataclass
+class RankedVacancy:
+    vacancy: VacancyItem
+    score: float
+    local_score: float
+    salary_score: float
+    freshness_score: float
+
+
+@dataclass
+class VacancyRanker:
+    """
+    Scores the whole candidate set at once and orders it by descending score.
+    Every component is normalized to [0, 1] before weighting:
+    - local: share of vacancy keywords found in candidate info
+    - salary: how well vacancy salary range covers the expected salary
+    - freshness: exponential decay by publication age
+    Vacancies with a cached negative LLM verdict (blocked list) are dropped.
+    """
+
+    candidate_info: str
+    expected_salary: int | None = None
+    local_weight: float = 0.6
+    salary_weight: float = 0.2
+    freshness_weight: float = 0.2
+
+    def __post_init__(self) -> None:
+        self._candidate_tokens = _tokenize(self.candidate_info)
+
+    def rank(self, vacancies: Iterable[VacancyItem], blocked: set[int] | None = None) -> List[RankedVacancy]:
+        blocked = blocked or set()
+        now = datetime.now(timezone.utc)
+
+        rv = []
+        for vacancy in vacancies:
+            if int(vacancy.id) in blocked:
+                logger.debug(f"Dropping blocked vacancy from ranking: {vacancy.id}")
+                continue
+
+            local_score = self._local_score(vacancy)
+            salary_score = self._salary_score(vacancy)
+            freshness_score = self._freshness_score(vacancy, now)
+            score = (
+                self.local_weight * local_score
+                + self.salary_weight * salary_score
+                + self.freshness_weight * freshness_score
+            )
+            rv.append(RankedVacancy(vacancy, score, local_score, salary_score, freshness_score))
+
+        rv.sort(key=lambda x: x.score, reverse=True)
+        return rv
+
+    def _local_score(self, vacancy: VacancyItem) -> float:
+        tokens = _vacancy_tokens(vacancy)
+        if not tokens or not self._candidate_tokens:
+            return 0.0
+        return len(tokens & self._candidate_tokens) / len(tokens)
+
+    def _salary_score(self, vacancy: VacancyItem) -> float:
+        salary = vacancy.salary_range
+        # Unknown salary is neither good nor bad
+        if salary is None or not (salary.from_int or salary.to_int):
+            return 0.5
+        if not self.expected_salary:
+            return 1.0
+
+        upper = salary.to_int or salary.from_int or 0
+        return min(1.0, upper / self.expected_salary)
+
+    def _freshness_score(self, vacancy: VacancyItem, now: datetime) -> float:
+        if not vacancy.published_at:
+            return 0.0
+        try:
+            published_at = parse_invalid_datetime(vacancy.published_at)
+        except ValueError:
+            return 0.0
+
+        age_days = max(0.0, (now - published_at).total_seconds() / 86400)
+        return 0.5 ** (age_days / FRESHNESS_HALF_LIFE_DAYS)
@@ -0,0 +1,47 @@
+import logging
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence
+
+from operations.apply_similar.utils.html_text import html_to_blocks
+
+logger = logging.getLogger(__package__)
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Rough average length of a BPE token, both for latin and cyrillic text
+CHARS_PER_TOKEN = 4
+# Descriptions sent to a worker process at once, amortizes pickling and IPC per task
+PREPARE_CHUNK_SIZE = 8
+
+# Description blocks with their token counts
+PreparedText = tuple[tuple[str, int], ...]
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count without provider tokenizer"""
+    return sum(math.ceil(len(token) / CHARS_PER_TOKEN) for token in TOKEN_RE.findall(text))
+
+
+def prepare_description(html: str) -> PreparedText:
+    """Strip html and count tokens of every block, the CPU-heavy part of building a prompt"""
+    return tuple((block, count_tokens(block)) for block in html_to_blocks(html))
+
+
+class TextPreparePool:
+    """
+    Prepares batches of vacancy descriptions in worker processes,
+    so large runs use all cores instead of holding the GIL of the main one.
+    """
+
+    def __init__(self, workers: int, chunk_size: int = PREPARE_CHUNK_SIZE):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def prepare(self, descriptions: Sequence[str]) -> List[PreparedText]:
+        chunk_size = max(1, min(self.chunk_size, math.ceil(len(descriptions) / self.workers)))
+        return list(self._executor.map(prepare_description, descriptions, chunksize=chunk_size))
+
+    def close(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
@@ -1,5 +1,6 @@
 import logging
 from dataclasses import dataclass
+from typing import List
 
 from ai.base import BaseLLM, LLMError
 from api.hh_api.schemas.vacancies import VacancyItem
@@ -11,6 +12,14 @@ def _serialize_for_llm(vacancy: VacancyItem) -> str:
     return f"Требования: {vacancy.snippet.requirement}\nОбязанности: {vacancy.snippet.responsibility}\n"
 
 
+def _parse_verdict(msg: str) -> bool:
+    msg = msg.strip()
+    if msg.isdigit():
+        return int(msg) == 1
+
+    return True
+
+
 @dataclass
 class VacancyRelevanceLLM:
     chat: BaseLLM
@@ -22,12 +31,21 @@ class VacancyRelevanceLLM:
             logger.error(ex)
             return True
 
+    def verify_many(self, vacancies: List[VacancyItem]) -> List[bool]:
+        """Verify vacancies concurrently, a vacancy failed to verify is considered relevant"""
+        results = self.chat.send_many([_serialize_for_llm(vacancy) for vacancy in vacancies])
+        rv = []
+        for result in results:
+            if isinstance(result, LLMError):
+                logger.error(result)
+                rv.append(True)
+            else:
+                rv.append(_parse_verdict(result))
+        return rv
+
     def _verify(self, vacancy: VacancyItem, footer_msg: str = "") -> bool:
         vacancy_info = _serialize_for_llm(vacancy)
         logger.debug(f"AI prompt:\n {vacancy_info}")
 
         msg = self.chat.send_message(vacancy_info)
-        if msg.isdigit():
-            return int(msg) == 1
-
-        return True
+        return _parse_verdict(msg)
@@ -1,23 +1,35 @@
 import argparse
 import datetime
 import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import astuple, dataclass, fields
 from datetime import timedelta
+from pathlib import Path
 from typing import List
 
+from prettytable import PrettyTable
 from tqdm import tqdm
 
-from api import HHApi
+from api import ApiError, HHApi
+from api.errors import ResourceNotFound
 from api.hh_api.schemas.negotiations import (
     Employer,
     GetNegotiationsListResponse,
     NegotiationItem,
     NegotiationState,
-    Vacancy,
 )
-from constants import INVALID_ISO8601_FORMAT
 from main import BaseOperation
 from main import Namespace as BaseNamespace
-from utils import truncate_string
+from mixins import get_blacklisted_employers
+from state import get_state_store
+from utils import (
+    BlacklistedEmployersDB,
+    get_config_path,
+    parse_invalid_datetime,
+    print_err,
+    truncate_string,
+)
 
 logger = logging.getLogger(__package__)
 
@@ -26,6 +38,84 @@ class Namespace(BaseNamespace):
     older_than: int
     blacklist_discard: bool
     all: bool
+    workers: int
+    plan: bool
+    resume: bool
+
+
+@dataclass
+class JournalAction:
+    kind: str  # "delete" or "blacklist"
+    target_id: str
+    url: str | None
+    name: str
+    state_name: str = ""
+    decline_allowed: bool = False
+    done: bool = False
+    # For deletes of discards: employer that is blacklisted once the negotiation is deleted
+    employer_id: str = ""
+
+
+JOURNAL_COLUMNS = ", ".join(x.name for x in fields(JournalAction))
+JOURNAL_PARAMS = ", ".join("?" for _ in fields(JournalAction))
+
+
+class ClearNegotiationsJournal:
+    """
+    Planned deletions and blacklist actions of unfinished clear-negotiations run.
+    Table `journal_actions` of the state database, finished actions are marked one by one.
+    """
+
+    name = "clear_negotiations"
+
+    def __init__(self, config_path: str | Path | None = None):
+        self._store = get_state_store(config_path or get_config_path())
+        self._store.import_legacy("clear_negotiations_journal.json", self._import)
+        self.actions: List[JournalAction] = [
+            JournalAction(*row[:5], decline_allowed=bool(row[5]), done=bool(row[6]), employer_id=row[7])
+            for row in self._store.query(
+                f"SELECT {JOURNAL_COLUMNS} FROM journal_actions WHERE journal = ? ORDER BY position", (self.name,)
+            )
+        ]
+
+    @classmethod
+    def _import(cls, conn: sqlite3.Connection, data: dict) -> None:
+        cls._insert(conn, [JournalAction(**x) for x in data.get("actions", [])])
+
+    @classmethod
+    def _insert(cls, conn: sqlite3.Connection, actions: List[JournalAction]) -> None:
+        conn.execute("DELETE FROM journal_actions WHERE journal = ?", (cls.name,))
+        conn.executemany(
+            f"INSERT INTO journal_actions (journal, position, {JOURNAL_COLUMNS}) VALUES (?, ?, {JOURNAL_PARAMS})",
+            [(cls.name, i, *astuple(x)) for i, x in enumerate(actions)],
+        )
+
+    def save(self) -> None:
+        """Replace the whole journal in one transaction."""
+        with self._store.transaction() as conn:
+            self._insert(conn, self.actions)
+
+    def start(self, actions: List[JournalAction]) -> None:
+        self.actions = actions
+        self.save()
+
+    def mark_done(self, action: JournalAction) -> None:
+        """Persist a finished action without rewriting the rest of the journal."""
+        action.done = True
+        with self._store.transaction() as conn:
+            conn.execute(
+                "UPDATE journal_actions SET done = 1 WHERE journal = ? AND kind = ? AND target_id = ?",
+                (self.name, action.kind, action.target_id),
+            )
+
+    @property
+    def pending(self) -> List[JournalAction]:
+        return [x for x in self.actions if not x.done]
+
+    def clear(self) -> None:
+        self.actions = []
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM journal_actions WHERE journal = ?", (self.name,))
 
 
 class Operation(BaseOperation):
@@ -53,6 +143,25 @@ class Operation(BaseOperation):
             default=False,
             action=argparse.BooleanOptionalAction,
         )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=4,
+            help="Количество параллельных запросов на удаление",
+        )
+        parser.add_argument(
+            "--plan",
+            default=False,
+            action=argparse.BooleanOptionalAction,
+            help="Только показать, какие отклики будут удалены и какие работодатели заблокированы",
+        )
+        parser.add_argument(
+            "--resume",
+            default=False,
+            action=argparse.BooleanOptionalAction,
+            help="Продолжить прерванную очистку по сохраненному журналу, не запрашивая отклики заново",
+        )
 
     def _get_active_negotiations(self, api_client: HHApi) -> List[NegotiationItem]:
         """
@@ -85,20 +194,172 @@ class Operation(BaseOperation):
                 break
         return rv
 
-    def _should_delete(self, args: Namespace, item: NegotiationItem) -> bool:
+    def _should_delete(self, args: Namespace, item: NegotiationItem, cutoff: datetime.datetime) -> bool:
         state: NegotiationState = item.state
         is_discard: bool = state.id == "discard"
 
+        # updated_at is parsed only for responses, the only state where age matters
         return bool(
-            args.all
-            or is_discard
-            or (
-                state.id == "response"
-                and (datetime.datetime.now(datetime.timezone.utc) - timedelta(days=args.older_than))
-                > datetime.datetime.strptime(item.updated_at, INVALID_ISO8601_FORMAT)
+            args.all or is_discard or (state.id == "response" and cutoff > parse_invalid_datetime(item.updated_at))
+        )
+
+    def _get_delete_plan(self, args: Namespace, negotiations: List[NegotiationItem]) -> List[NegotiationItem]:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - timedelta(days=args.older_than)
+        return [item for item in negotiations if self._should_delete(args, item, cutoff)]
+
+    @staticmethod
+    def _print_plan(to_delete: List[NegotiationItem], employers: List[Employer]) -> None:
+        t = PrettyTable(field_names=["Статус", "Обновлен", "Вакансия"], align="l", valign="t")
+        t.add_rows(
+            [
+                [
+                    item.state.name,
+                    item.updated_at,
+                    truncate_string(item.vacancy.name) if item.vacancy else "-",
+                ]
+                for item in to_delete
+            ]
+        )
+        print(t)
+        for employer in employers:
+            print("🚫 Будет заблокирован", employer.alternate_url, "(", truncate_string(employer.name), ")")
+        print(f"Будет удалено откликов: {len(to_delete)}, заблокировано работодателей: {len(employers)}")
+
+    @staticmethod
+    def _employers_to_blacklist(
+        to_delete: List[NegotiationItem], blacklisted: BlacklistedEmployersDB
+    ) -> List[Employer]:
+        """Unique employers of discards that aren't blacklisted yet"""
+        rv: dict[str, Employer] = {}
+        for item in to_delete:
+            if item.state.id != "discard" or item.vacancy is None:
+                continue
+            employer: Employer | None = item.vacancy.employer
+            if not employer or not employer.id:
+                # Employer is deleted or hidden
+                continue
+            if employer.id in blacklisted:
+                logger.debug(f"Employer is already blacklisted {employer.alternate_url}")
+                continue
+            rv.setdefault(employer.id, employer)
+        return list(rv.values())
+
+    @staticmethod
+    def _build_actions(to_delete: List[NegotiationItem], employers: List[Employer]) -> List[JournalAction]:
+        employer_ids = {str(employer.id) for employer in employers}
+
+        def blacklisted_after(item: NegotiationItem) -> str:
+            employer = item.vacancy.employer if item.state.id == "discard" and item.vacancy else None
+            return str(employer.id) if employer and str(employer.id) in employer_ids else ""
+
+        rv = [
+            JournalAction(
+                kind="delete",
+                target_id=item.id,
+                url=item.vacancy.alternate_url if item.vacancy else None,
+                name=item.vacancy.name if item.vacancy else "",
+                state_name=item.state.name,
+                decline_allowed=item.decline_allowed or False,
+                employer_id=blacklisted_after(item),
             )
+            for item in to_delete
+        ]
+        rv += [
+            JournalAction(kind="blacklist", target_id=str(employer.id), url=employer.alternate_url, name=employer.name)
+            for employer in employers
+        ]
+        return rv
+
+    @staticmethod
+    def _delete_negotiation(api_client: HHApi, action: JournalAction) -> None:
+        logger.info("Deleting negotiation")
+        try:
+            r_delete: bool = api_client.negotiations.delete(
+                action.target_id,
+                with_decline_message=action.decline_allowed,
+            )
+            assert r_delete
+        except ResourceNotFound:
+            # Deleted by previous interrupted run
+            logger.info(f"Negotiation {action.target_id} is already deleted")
+
+        if action.url is None:
+            logger.info("Deleted negotiation without vacancy defined")
+            return
+
+        print(
+            "❌ Удален",
+            action.state_name.lower(),
+            action.url,
+            "(",
+            truncate_string(action.name),
+            ")",
+        )
+
+    @staticmethod
+    def _blacklist_employer(api_client: HHApi, action: JournalAction) -> None:
+        logger.info(f"Blacklisting employer with url {action.url}")
+        api_client.blacklisted_employers.put(action.target_id)
+
+        print(
+            "🚫 Заблокирован",
+            action.url,
+            "(",
+            truncate_string(action.name),
+            ")",
         )
 
+    def _execute(
+        self,
+        args: Namespace,
+        api_client: HHApi,
+        journal: ClearNegotiationsJournal,
+        blacklisted: BlacklistedEmployersDB | None,
+    ) -> None:
+        actions = journal.pending
+        logger.info(f"Executing {len(actions)} cleanup actions")
+
+        # Requests are still spaced by the api client delay, workers only overlap waiting for responses
+        with (
+            ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="clear") as executor,
+            tqdm(total=len(actions), desc="Очистка откликов", unit="шт") as progress,
+        ):
+            deletes = [x for x in actions if x.kind == "delete"]
+            self._run_actions(executor, progress, api_client, journal, blacklisted, deletes)
+            # Employer is blacklisted only after all its discarded negotiations are deleted
+            not_deleted = {x.employer_id for x in journal.actions if x.kind == "delete" and not x.done}
+            blacklists = [x for x in actions if x.kind == "blacklist" and x.target_id not in not_deleted]
+            self._run_actions(executor, progress, api_client, journal, blacklisted, blacklists)
+
+    def _run_actions(
+        self,
+        executor: ThreadPoolExecutor,
+        progress: tqdm,
+        api_client: HHApi,
+        journal: ClearNegotiationsJournal,
+        blacklisted: BlacklistedEmployersDB | None,
+        actions: List[JournalAction],
+    ) -> None:
+        futures = {
+            executor.submit(
+                self._delete_negotiation if action.kind == "delete" else self._blacklist_employer,
+                api_client,
+                action,
+            ): action
+            for action in actions
+        }
+
+        for future in as_completed(futures):
+            action = futures[future]
+            try:
+                future.result()
+                journal.mark_done(action)
+                if action.kind == "blacklist" and blacklisted is not None:
+                    blacklisted.add(action.target_id)
+            except ApiError as ex:
+                logger.error(ex)
+            progress.update()
+
     def run(self, args: Namespace, api_client: HHApi, *_) -> None:
         """
         Execute negotiations cleanup operation.
@@ -124,55 +385,45 @@ class Operation(BaseOperation):
                 --blacklist-discard
                     If enabled, employers of discarded negotiations are added
                     to the blacklist so their vacancies no longer appear as
-                    recommended.
+                    recommended. Each employer is blacklisted once per run.
+
+                --workers <int>
+                    Number of concurrent delete requests. Default: 4.
+
+                --plan
+                    Print the delete plan and exit without changing anything.
+
+                --resume
+                    Continue an interrupted run from the persisted journal
+                    without listing negotiations again, other filters are ignored.
+                    Default: disabled, a new run replaces the journal.
 
             api_client (HHApi)
         """
         logger.info("Clear negotiations is requested")
-        negotiations: List[NegotiationItem] = self._get_active_negotiations(api_client)
-
-        for item in tqdm(negotiations, desc="Очистка откликов", unit="шт"):
-            logger.debug(f"First item: {item.url}")
-            if self._should_delete(args, item):
-                logger.info("Deleting negotiation")
-
-                decline_allowed: bool = item.decline_allowed or False
-                r_delete: bool = api_client.negotiations.delete(
-                    item.id,
-                    with_decline_message=decline_allowed,
-                )
-                assert r_delete
-
-                vacancy: Vacancy | None = item.vacancy
-                if vacancy is None:
-                    logger.info("Skipping negotiations without vacancy defined")
-                    continue
-
-                state: NegotiationState = item.state
-                is_discard: bool = state.id == "discard"
-
-                print(
-                    "❌ Удален",
-                    state.name.lower(),
-                    vacancy.alternate_url,
-                    "(",
-                    truncate_string(vacancy.name),
-                    ")",
-                )
-                if args.blacklist_discard and is_discard:
-                    employer: Employer | None = vacancy.employer
-                    if not employer or not employer:
-                        # Employer is deleted or hidden
-                        continue
-                    logger.info(f"Blacklisting employer with url {employer.alternate_url}")
-                    api_client.blacklisted_employers.put(str(employer.id))
-
-                    print(
-                        "🚫 Заблокирован",
-                        employer.alternate_url,
-                        "(",
-                        truncate_string(employer.name),
-                        ")",
-                    )
+        journal = ClearNegotiationsJournal(args.data_path)
+        if args.resume and journal.pending and not args.plan:
+            print(f"↩️ Продолжаем прерванную очистку, осталось действий: {len(journal.pending)}")
+            self._execute(args, api_client, journal, BlacklistedEmployersDB(args.data_path))
+        else:
+            if journal.pending and not args.plan:
+                logger.warning(f"Unfinished cleanup with {len(journal.pending)} actions is replaced, use --resume")
+            negotiations: List[NegotiationItem] = self._get_active_negotiations(api_client)
+            blacklisted = get_blacklisted_employers(api_client, args.data_path) if args.blacklist_discard else None
 
+            to_delete = self._get_delete_plan(args, negotiations)
+            employers = self._employers_to_blacklist(to_delete, blacklisted) if blacklisted is not None else []
+            if args.plan:
+                self._print_plan(to_delete, employers)
+                return
+
+            journal.start(self._build_actions(to_delete, employers))
+            self._execute(args, api_client, journal, blacklisted)
+
+        if journal.pending:
+            print_err(
+                f"❗ Не выполнено действий: {len(journal.pending)}, запустите команду с --resume чтобы продолжить"
+            )
+            return
+        journal.clear()
         print("🧹 Чистка откликов завершена!")
@@ -57,6 +57,7 @@ class Operation(BaseOperation):
 
     def run(self, args: Namespace, api_client: HHApi, *_) -> None:
         self.api_client = api_client
+        self.data_path = args.data_path
 
         resumes: GetResumesResponse = api_client.my_resumes.get()
         for i, resume in enumerate(resumes.items):
@@ -80,7 +81,9 @@ class Operation(BaseOperation):
         cfg = Config.load()
 
         prompts = get_prompts(cfg.llm.resume_builder.prompts, cfg.candidate)
-        resume_builder_chat = get_chat(prompts, cfg.llm.resume_builder.options)
+        resume_builder_chat = get_chat(
+            prompts, cfg.llm.resume_builder.options, cfg.llm.resume_builder.backends, data_path=self.data_path
+        )
 
         return resume_builder_chat.send_message(resume_serialized, True)
 
@@ -3,8 +3,8 @@ import logging
 import random
 import re
 import time
-from itertools import count
-from typing import List, Tuple
+from concurrent.futures import Future
+from typing import Iterator, List, Tuple
 
 from prompt_toolkit import prompt
 
@@ -14,12 +14,16 @@ from api.hh_api.schemas.negotiations import (
     SalaryRange,
     Vacancy,
 )
-from mixins import get_resume_id
+from mixins import get_blacklisted_employers, get_resume_id
+from operations.reply_employers.store import ChatStore
 from operations.reply_employers.utils import (
+    AIDrafts,
     NegotiationCommandType,
-    get_message_history,
+    build_ai_message,
     parse_input,
+    prefetch_message_histories,
     print_negotiation_header,
+    print_token,
     process_ai,
     process_ban,
     process_cancel,
@@ -30,7 +34,12 @@ from src.api import ApiError, HHApi
 from src.config import Config
 from src.main import BaseOperation
 from src.main import Namespace as BaseNamespace
-from src.utils import parse_interval, print_err, random_text
+from src.utils import (
+    BlacklistedEmployersDB,
+    compile_template,
+    parse_interval,
+    print_err,
+)
 
 GOOGLE_DOCS_RE = re.compile(
     r"\b(?:https?:\/\/)?(?:docs|forms|sheets|slides|drive)\.google\.com\/(?:document|spreadsheets|presentation|forms|file)\/(?:d|u)\/[a-zA-Z0-9_\-]+(?:\/[a-zA-Z0-9_\-]+)?\/?(?:[?#].*)?\b|\b(?:https?:\/\/)?(?:goo\.gl|forms\.gle)\/[a-zA-Z0-9]+\b",  # noqa: E501
@@ -39,6 +48,9 @@ GOOGLE_DOCS_RE = re.compile(
 
 logger = logging.getLogger(__package__)
 
+# Max page size of /negotiations
+NEGOTIATIONS_PER_PAGE = 100
+
 
 class Namespace(BaseNamespace):
     reply_message: str
@@ -48,6 +60,9 @@ class Namespace(BaseNamespace):
     only_interviews: bool
     reply_unanswered: bool
     reply_not_viewed_by_opponent: bool
+    prefetch: int
+    chat_store: bool
+    ai_drafts: int
 
 
 class Operation(BaseOperation):
@@ -102,6 +117,27 @@ class Operation(BaseOperation):
             default=False,
             action=argparse.BooleanOptionalAction,
         )
+        parser.add_argument(
+            "--prefetch",
+            type=int,
+            default=3,
+            help="Сколько следующих чатов загружать заранее в фоне",
+        )
+        parser.add_argument(
+            "--chat-store",
+            help="Хранить историю чатов локально и загружать только изменившиеся чаты",
+            default=True,
+            action=argparse.BooleanOptionalAction,
+        )
+        parser.add_argument(
+            "--ai-drafts",
+            type=int,
+            default=0,
+            help=(
+                "Заранее готовить в фоне AI-черновики ответов в чатах, где последним писал работодатель. "
+                "Значение — количество одновременных запросов к LLM, 0 — выключено"
+            ),
+        )
 
     def run(self, args: Namespace, api_client: HHApi) -> None:
         self.api_client: HHApi = api_client
@@ -109,15 +145,20 @@ class Operation(BaseOperation):
         self.resume_id = get_resume_id(self.api_client)
         self.reply_min_interval, self.reply_max_interval = args.reply_interval
 
+        self.config = Config.load(args.config_path)
         self.reply_message = None
         if args.reply_message is not None:
-            cfg = Config().load()
-            default_reply_msg = cfg.default_messages.chat_reply.message
+            default_reply_msg = self.config.default_messages.chat_reply.message
 
             self.reply_message = args.reply_message or default_reply_msg
             assert self.reply_message, "`reply_message` must be defined in settings or args"
+            self.reply_template = compile_template(self.reply_message)
 
         self.max_pages = args.max_pages
+        self.prefetch = args.prefetch
+        self.data_path = args.data_path
+        self.chat_store = ChatStore(args.data_path) if args.chat_store else None
+        self.ai_drafts = args.ai_drafts
 
         self.only_invitations = args.only_invitations
         self.only_interviews = args.only_interviews
@@ -132,20 +173,9 @@ class Operation(BaseOperation):
 
         self._reply_chats()
 
-    def _get_blacklisted(self) -> list[str]:
-        """Return list of blacklisted employers ids"""
-        rv = []
-        # In this api method pages count from 0
-        for page in count(0):
-            r = self.api_client.blacklisted_employers.get(page=page)
-            rv += [item.id for item in r.items]
-            if page + 1 >= r.pages:
-                break
-        return rv
-
     def _reply_chats(self) -> None:
-        blacklisted = self._get_blacklisted()
-        logger.debug(f"blacklisted: {blacklisted}")
+        blacklisted = get_blacklisted_employers(self.api_client, self.data_path)
+        logger.debug(f"blacklisted: {len(blacklisted)} employers")
         me = self.me = self.api_client.get("/me")
 
         basic_message_placeholders = {
@@ -154,25 +184,50 @@ class Operation(BaseOperation):
             "email": me.get("email", ""),
             "phone": me.get("phone", ""),
         }
-        _negotiations = self._get_negotiations()
-        logger.debug(f"Num of negotiations {len(_negotiations)}")
-        for negotiation in _negotiations:
-            try:
-                # Skipping other resumes
-                if not should_reply_to_negotiation(
-                    self.only_invitations, self.only_interviews, self.resume_id, negotiation, blacklisted
-                ):
-                    logger.info("Skipping irrelevant negotiation")
-                    continue
+        # Skipping other resumes
+        eligible = (
+            negotiation
+            for negotiation in self._get_negotiations()
+            if should_reply_to_negotiation(
+                self.only_invitations, self.only_interviews, self.resume_id, negotiation, blacklisted
+            )
+        )
+        drafts: AIDrafts | None = None
+        if self.ai_drafts and not self.reply_message:
+            drafts = AIDrafts(self.config, self.ai_drafts, self.data_path)
+        histories = prefetch_message_histories(
+            self.api_client, eligible, self.prefetch, self.chat_store, on_submit=drafts.submit if drafts else None
+        )
+        try:
+            self._reply_negotiations(histories, blacklisted, basic_message_placeholders, drafts)
+        finally:
+            if drafts is not None:
+                drafts.close()
+
+        print("📝 Сообщения разосланы!")
 
+    def _reply_negotiations(
+        self,
+        histories: Iterator[Tuple[NegotiationItem, Future]],
+        blacklisted: BlacklistedEmployersDB,
+        basic_message_placeholders: dict[str, str],
+        drafts: AIDrafts | None,
+    ) -> None:
+        for negotiation, history in histories:
+            try:
                 vacancy: Vacancy | None = negotiation.vacancy
                 assert vacancy is not None
                 salary: SalaryRange | None = vacancy.salary_range
                 employer: Employer | None = vacancy.employer
                 assert employer is not None
 
+                # Employer could be banned in one of previous chats
+                if employer.id in blacklisted:
+                    logger.info("Skipping negotiation with banned employer")
+                    continue
+
                 nid = negotiation.id
-                message_history, last_message = get_message_history(self.api_client, nid)
+                message_history, last_message = history.result()
                 logger.debug(f"Last msg is {last_message}")
 
                 is_employer_message = last_message.author.participant_type == "employer"
@@ -189,12 +244,13 @@ class Operation(BaseOperation):
                     not negotiation.viewed_by_opponent and self.reply_not_viewed_by_opponent
                 ):
                     if self.reply_message:
-                        msg_to_send = random_text(self.reply_message) % message_placeholders
+                        msg_to_send = self.reply_template.render(message_placeholders)
                         logger.debug(f"Msg to send: {msg_to_send}")
                         process_send_msg(self.api_client, msg_to_send, vacancy, nid)
                     else:
                         print_negotiation_header(message_history, message_placeholders, vacancy, salary)
-                        self._parse_input(employer, vacancy, negotiation, blacklisted, message_history)
+                        draft = drafts.take(nid) if drafts else ""
+                        self._parse_input(employer, vacancy, negotiation, blacklisted, message_history, draft)
 
                     time.sleep(
                         random.uniform(
@@ -205,18 +261,20 @@ class Operation(BaseOperation):
 
             except ApiError as ex:
                 logger.error(ex)
-
-        print("📝 Сообщения разосланы!")
+            finally:
+                # Draft of skipped chat is not needed anymore
+                if drafts is not None:
+                    drafts.cancel(negotiation.id)
 
     def _parse_input(
         self,
         employer: Employer,
         vacancy: Vacancy,
         negotiation: NegotiationItem,
-        blacklisted: List[str],
+        blacklisted: BlacklistedEmployersDB,
         message_history: List[str],
+        def_input_text: str = "",
     ) -> bool:
-        def_input_text = ""
         while 1:
             try:
                 msg_to_send = prompt("Ваше сообщение: ", default=def_input_text).strip()
@@ -234,22 +292,34 @@ class Operation(BaseOperation):
                 case NegotiationCommandType.CANCEL:
                     return process_cancel(self.api_client, cmd.data["decline_allowed"], vacancy, negotiation.id)
                 case NegotiationCommandType.AI:
-                    msg: str = (
-                        "Сообщения в чате:\n \n".join(message_history) + "\n" + "Ввод пользователя:\n" + cmd.data["msg"]
+                    msg: str = build_ai_message(message_history, cmd.data["msg"])
+                    print("🤖 ", end="")
+                    def_input_text = process_ai(
+                        self.config, msg, on_token=print_token, fresh=True, data_path=self.data_path
                     )
-                    def_input_text = process_ai(msg)
+                    print()
                     continue
                 case NegotiationCommandType.MESSAGE:
                     return process_send_msg(self.api_client, msg_to_send, vacancy, negotiation.id)
         return False
 
     def _get_negotiations(self) -> List[NegotiationItem]:
-        rv = []
+        """
+        Fetch all pages before processing, status filters are applied by API.
+        Replies, cancels and bans reorder the listing, so pages fetched later would be shifted.
+        """
+        if self.only_invitations:
+            status = "invitations"
+        elif self.only_interviews:
+            status = "interview"
+        else:
+            status = "active"
+
+        rv: List[NegotiationItem] = []
         for page in range(self.max_pages):
-            res = self.api_client.negotiations.get(page=page, status="active")
+            res = self.api_client.negotiations.get(page=page, per_page=NEGOTIATIONS_PER_PAGE, status=status)
+            logger.debug(f"Got negotiations page {page + 1}/{res.pages}")
             rv.extend(res.items)
             if page >= res.pages - 1:
                 break
-            page += 1
-
         return rv
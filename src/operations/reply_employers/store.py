@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import List, Tuple
+
+from api.hh_api.schemas.negotiations_messages import Author, NegotiationsMessagesItem
+from src.utils import get_config_path
+from state import get_state_store
+
+
+class ChatStore:
+    """
+    Local store of negotiations message history.
+    Tables `negotiations` and `messages` of the state database.
+    History of negotiation is valid while its `updated_at` is unchanged.
+    """
+
+    def __init__(self, config_path: str | Path | None = None):
+        self._store = get_state_store(config_path or get_config_path())
+
+    def get_history(self, nid: str, updated_at: str) -> Tuple[List[str], NegotiationsMessagesItem] | None:
+        """Return stored history if negotiation wasn't updated since last sync"""
+        with self._store.snapshot() as conn:
+            row = conn.execute(
+                "SELECT last_text, last_author FROM negotiations WHERE id = ? AND updated_at = ?",
+                (nid, updated_at),
+            ).fetchone()
+            if row is None:
+                return None
+            messages = conn.execute(
+                "SELECT text FROM messages WHERE negotiation_id = ? ORDER BY position", (nid,)
+            ).fetchall()
+
+        last_text, last_author = row
+        return [text for (text,) in messages], NegotiationsMessagesItem(last_text, Author(last_author))
+
+    def save_history(
+        self, nid: str, updated_at: str, message_history: List[str], last_message: NegotiationsMessagesItem
+    ) -> None:
+        with self._store.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO negotiations (id, updated_at, last_text, last_author) VALUES (?, ?, ?, ?)",
+                (nid, updated_at, last_message.text or "", last_message.author.participant_type),
+            )
+            conn.execute("DELETE FROM messages WHERE negotiation_id = ?", (nid,))
+            conn.executemany(
+                "INSERT INTO messages (negotiation_id, position, text) VALUES (?, ?, ?)",
+                [(nid, i, text) for i, text in enumerate(message_history)],
+            )
@@ -1,7 +1,11 @@
 import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Tuple
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Container, Iterable, Iterator, List, Tuple
 
 from ai.utils import get_chat, get_prompts
 from api.hh_api.schemas.negotiations import (
@@ -11,18 +15,23 @@ from api.hh_api.schemas.negotiations import (
     Vacancy,
 )
 from api.hh_api.schemas.negotiations_messages import NegotiationsMessagesItem
+from operations.reply_employers.store import ChatStore
 from src.api import HHApi
 from src.config import Config
+from src.utils import BlacklistedEmployersDB
 
 logger = logging.getLogger(__name__)
 
+# Max seconds to wait for a background AI draft when chat is opened
+AI_DRAFT_TIMEOUT = 10.0
+
 
 def should_reply_to_negotiation(
     only_invitations: bool,
     only_interviews: bool,
     selected_resume_id: str,
     negotiation: NegotiationItem,
-    blacklisted: List[str],
+    blacklisted: Container[str | None],
 ) -> bool:
     """Check if user should reply to this msg"""
     resume = negotiation.resume
@@ -93,6 +102,70 @@ def get_message_history(api_client: HHApi, nid: str) -> Tuple[List[str], Negotia
     return message_history, last_message
 
 
+def load_message_history(
+    api_client: HHApi, negotiation: NegotiationItem, store: ChatStore | None = None
+) -> Tuple[List[str], NegotiationsMessagesItem]:
+    """Get message history from local store, fetch it only if negotiation changed since last sync"""
+    if store is None:
+        return get_message_history(api_client, negotiation.id)
+
+    if not negotiation.has_updates and (cached := store.get_history(negotiation.id, negotiation.updated_at)):
+        logger.debug(f"Using stored history for negotiation {negotiation.id}")
+        return cached
+
+    message_history, last_message = get_message_history(api_client, negotiation.id)
+    store.save_history(negotiation.id, negotiation.updated_at, message_history, last_message)
+    return message_history, last_message
+
+
+def prefetch_message_histories(
+    api_client: HHApi,
+    negotiations: Iterable[NegotiationItem],
+    window: int,
+    store: ChatStore | None = None,
+    on_submit: Callable[[NegotiationItem, Future], None] | None = None,
+) -> Iterator[Tuple[NegotiationItem, "Future[Tuple[List[str], NegotiationsMessagesItem]]"]]:
+    """
+    Yield negotiations with futures of their message history.
+    History for the next `window` negotiations is loaded in background threads
+    while the current one is being processed.
+    `on_submit` is called for every scheduled negotiation, e.g. to start drafting a reply.
+    With `window` 0 every history is loaded inline, when its negotiation is reached.
+    """
+    if window <= 0:
+        for negotiation in negotiations:
+            future: Future = Future()
+            try:
+                future.set_result(load_message_history(api_client, negotiation, store))
+            except Exception as e:
+                future.set_exception(e)
+            if on_submit is not None:
+                on_submit(negotiation, future)
+            yield negotiation, future
+        return
+
+    executor = ThreadPoolExecutor(max_workers=window, thread_name_prefix="history")
+    pending: deque[Tuple[NegotiationItem, Future]] = deque()
+    items = iter(negotiations)
+
+    def submit(negotiation: NegotiationItem) -> None:
+        future = executor.submit(load_message_history, api_client, negotiation, store)
+        pending.append((negotiation, future))
+        if on_submit is not None:
+            on_submit(negotiation, future)
+
+    try:
+        for negotiation in islice(items, window + 1):
+            submit(negotiation)
+
+        while pending:
+            yield pending.popleft()
+            for negotiation in islice(items, 1):
+                submit(negotiation)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def print_negotiation_header(
     message_history: List[str],
     message_placeholders: dict[str, str],
@@ -147,14 +220,14 @@ def parse_input(
         return NegotiationCommand(type=NegotiationCommandType.MESSAGE, data={"msg": msg})
 
 
-def process_ban(api_client: HHApi, employer: Employer, blacklisted: List[str]) -> bool:
+def process_ban(api_client: HHApi, employer: Employer, blacklisted: BlacklistedEmployersDB) -> bool:
     employer_id = employer.id
     if employer_id is None:
         logger.debug("Employer id is none")
         return False
 
     api_client.blacklisted_employers.put(employer_id)
-    blacklisted.append(employer_id)
+    blacklisted.add(employer_id)
     print(
         "🚫 Работодатель добавлен в черный список",
         employer.alternate_url,
@@ -170,16 +243,83 @@ def process_cancel(api_client: HHApi, decline_allowed: str, vacancy: Vacancy, ne
     return True
 
 
-def process_ai(user_message: str) -> str:
-    config = Config.load()
+def build_ai_message(message_history: List[str], user_input: str) -> str:
+    return "Сообщения в чате:\n \n".join(message_history) + "\n" + "Ввод пользователя:\n" + user_input
+
+
+class AIDrafts:
+    """
+    Generates AI reply drafts in background for chats where employer spoke last.
+    Drafts are started as soon as chat history is scheduled for loading and
+    run with bounded concurrency, a draft of a skipped chat is cancelled.
+    """
+
+    def __init__(self, config: Config, workers: int, data_path: str | Path | None = None):
+        self.config = config
+        self.data_path = data_path
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ai-draft")
+        self._drafts: dict[str, Future[str | None]] = {}
+
+    def submit(self, negotiation: NegotiationItem, history: "Future[Tuple[List[str], NegotiationsMessagesItem]]"):
+        if negotiation.id not in self._drafts:
+            self._drafts[negotiation.id] = self._executor.submit(self._draft, history)
+
+    def _draft(self, history: "Future[Tuple[List[str], NegotiationsMessagesItem]]") -> str | None:
+        message_history, last_message = history.result()
+        if last_message.author.participant_type != "employer":
+            return None
+        return process_ai(self.config, build_ai_message(message_history, ""), data_path=self.data_path)
+
+    def take(self, nid: str, timeout: float = AI_DRAFT_TIMEOUT) -> str:
+        """Return draft for the chat, wait for unfinished one no longer than `timeout` seconds"""
+        future = self._drafts.pop(nid, None)
+        if future is None:
+            return ""
+        try:
+            return future.result(timeout=timeout) or ""
+        except TimeoutError:
+            future.cancel()
+            logger.info("AI draft is not ready yet, skipping it")
+            return ""
+        except Exception as ex:
+            logger.error(f"Failed to generate AI draft: {ex}")
+            return ""
+
+    def cancel(self, nid: str) -> None:
+        if (future := self._drafts.pop(nid, None)) is not None:
+            future.cancel()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def process_ai(
+    config: Config,
+    user_message: str,
+    on_token: Callable[[str], None] | None = None,
+    fresh: bool = False,
+    data_path: str | Path | None = None,
+) -> str:
     chat_cfg = config.llm.chat_reply
     prompts = get_prompts(chat_cfg.prompts, config.candidate)
-    chat = get_chat(prompts, chat_cfg.options)
+    chat = get_chat(
+        prompts, chat_cfg.options, chat_cfg.backends, interactive=on_token is not None, data_path=data_path
+    )
+    if fresh:
+        # User asked for a new variant, cached answer would repeat the previous one
+        chat = chat.fresh()
 
-    msg: str = chat.send_message(user_message, verify_tag_end=False)
+    if on_token is None:
+        return chat.send_message(user_message, verify_tag_end=False)
+
+    msg: str = chat.stream_message(user_message, on_token=on_token)
     return msg
 
 
+def print_token(token: str) -> None:
+    print(token, end="", flush=True)
+
+
 def process_send_msg(api_client: HHApi, msg_to_send: str, vacancy: Vacancy, nid: str) -> bool:
     api_client.negotiations_messages.post(nid, message=msg_to_send)
 
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock, RLock
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__package__)
+
+STATE_FILE = "state.sqlite3"
+# How long a writer waits for another process holding the write lock, seconds
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = (
+    # Access and refresh tokens, single row
+    """
+    CREATE TABLE IF NOT EXISTS tokens (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        access_token TEXT,
+        refresh_token TEXT,
+        access_expires_at INTEGER,
+        token_type TEXT
+    )
+    """,
+    # Other `Data` values as JSON, one row per key
+    "CREATE TABLE IF NOT EXISTS data (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    # Vacancies with negative relevance verdict or blocked by user
+    "CREATE TABLE IF NOT EXISTS blocked_vacancies (id INTEGER PRIMARY KEY, blocked_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS blacklisted_employers (id TEXT PRIMARY KEY)",
+    """
+    CREATE TABLE IF NOT EXISTS journal_actions (
+        journal TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        target_id TEXT NOT NULL,
+        url TEXT,
+        name TEXT NOT NULL,
+        state_name TEXT NOT NULL,
+        decline_allowed INTEGER NOT NULL,
+        done INTEGER NOT NULL,
+        employer_id TEXT NOT NULL,
+        PRIMARY KEY (journal, position)
+    )
+    """,
+    # LLM responses cache
+    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, used_at REAL NOT NULL)",
+    # Negotiations message history
+    """
+    CREATE TABLE IF NOT EXISTS negotiations (
+        id TEXT PRIMARY KEY,
+        updated_at TEXT NOT NULL,
+        last_text TEXT NOT NULL,
+        last_author TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS messages (
+        negotiation_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (negotiation_id, position)
+    )
+    """,
+)
+
+
+class StateStore:
+    """
+    Local state of the application: tokens, blocked vacancies, employers blacklist, journals and caches.
+    File: <config_dir>/state.sqlite3
+    The database is in WAL mode, so several CLI processes can share it: readers don't block the writer,
+    every update is a small transaction that touches only its own rows.
+    """
+
+    def __init__(self, config_dir: str | Path):
+        self.config_dir = Path(config_dir)
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.config_dir / STATE_FILE
+        # Connection is shared by threads of the process, statements are serialized
+        self._lock = RLock()
+        self._conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode the database stays consistent on crash, only the last commits may be lost on power failure
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self.transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Write transaction, committed on exit and rolled back on error.
+        Write lock is taken at the start, so read-modify-write sequences are not interleaved with other processes.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Read transaction: all queries see the same state of the database, writers are not blocked."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+            finally:
+                self._conn.execute("COMMIT")
+
+    def query(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: tuple[Any, ...] = ()) -> tuple[Any, ...] | None:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def get_meta(self, key: str) -> Any:
+        row = self.query_one("SELECT value FROM meta WHERE key = ?", (key,))
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def set_meta(conn: sqlite3.Connection, key: str, value: Any) -> None:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def import_legacy(self, filename: str, apply: Callable[[sqlite3.Connection, Any], None]) -> None:
+        """
+        One-time import of JSON file written by previous versions.
+        The file is renamed to `*.migrated` in the same transaction, so it's imported by one process only.
+        """
+        path = self.config_dir / filename
+        if not path.exists():
+            return
+        try:
+            with self.transaction() as conn:
+                # Another process may have imported it while we were waiting for the lock
+                if not path.exists():
+                    return
+                with path.open("r", encoding="utf-8", errors="replace") as f:
+                    apply(conn, json.load(f))
+                path.replace(path.with_name(path.name + ".migrated"))
+            logger.info(f"Imported {path} into {self.path}")
+        except (OSError, ValueError, TypeError, sqlite3.Error) as e:
+            logger.error(f"Failed to import {path}: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: dict[Path, StateStore] = {}
+_stores_lock = Lock()
+
+
+def get_state_store(config_dir: str | Path) -> StateStore:
+    """Store of the config dir, one connection per process"""
+    config_dir = Path(config_dir).resolve()
+    with _stores_lock:
+        store = _stores.get(config_dir)
+        if store is None:
+            store = _stores[config_dir] = StateStore(config_dir)
+        return store
@@ -4,16 +4,18 @@ import hashlib
 import json
 import platform
 import random
-import re
+import sqlite3
 import sys
+import time
 from datetime import datetime
-from functools import partial
+from functools import lru_cache, partial
 from os import getenv
 from pathlib import Path
-from threading import Lock
 from typing import Any
 
-from constants import INVALID_ISO8601_FORMAT
+from state import StateStore, get_state_store
+
+BLACKLIST_FOUND_KEY = "blacklisted_employers_found"
 
 print_err = partial(print, file=sys.stderr, flush=True)
 
@@ -35,33 +37,50 @@ class AttrDict(dict):
 
 
 class Data(dict):
+    """
+    Tokens and other values of the application, stored in the state database.
+    `save` writes only the given keys, each key is a row.
+    """
+
     def __init__(self, config_path: str | Path | None = None):
-        self._data_path = Path(config_path or get_config_path()) / "data.json"
-        self._lock = Lock()
+        self._store = get_state_store(config_path or get_config_path())
+        self._store.import_legacy("data.json", _save_data)
         self.load()
 
     def load(self) -> None:
-        if self._data_path.exists():
-            with self._lock:
-                with self._data_path.open("r", encoding="utf-8", errors="replace") as f:
-                    self.update(json.load(f))
+        with self._store.snapshot() as conn:
+            rows = conn.execute("SELECT key, value FROM data").fetchall()
+            row = conn.execute(f"SELECT {', '.join(TOKEN_FIELDS)} FROM tokens").fetchone()
+        for key, value in rows:
+            self[key] = json.loads(value)
+        if row is not None:
+            self["token"] = dict(zip(TOKEN_FIELDS, row))
 
     def save(self, *args: Any, **kwargs: Any) -> None:
-        self.update(*args, **kwargs)
-        self._data_path.parent.mkdir(exist_ok=True, parents=True)
-        with self._lock:
-            with self._data_path.open("w+", encoding="utf-8", errors="replace") as fp:
-                json.dump(
-                    self,
-                    fp,
-                    ensure_ascii=True,
-                    indent=2,
-                    sort_keys=True,
-                )
+        values = dict(*args, **kwargs)
+        self.update(values)
+        with self._store.transaction() as conn:
+            _save_data(conn, values)
 
     __getitem__ = dict.get
 
 
+TOKEN_FIELDS = ("access_token", "refresh_token", "access_expires_at", "token_type")
+
+
+def _save_data(conn: sqlite3.Connection, values: dict[str, Any]) -> None:
+    for key, value in values.items():
+        if key == "token":
+            conn.execute(
+                f"INSERT OR REPLACE INTO tokens (id, {', '.join(TOKEN_FIELDS)}) VALUES (1, ?, ?, ?, ?)",
+                tuple((value or {}).get(x) for x in TOKEN_FIELDS),
+            )
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO data (key, value) VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=True))
+            )
+
+
 def truncate_string(s: str, limit: int = 75, ellipsis: str = "…") -> str:
     return s[:limit] + bool(s[limit:]) * ellipsis
 
@@ -71,25 +90,121 @@ def make_hash(data: str) -> str:
 
 
 def parse_invalid_datetime(dt: str) -> datetime:
-    return datetime.strptime(dt, INVALID_ISO8601_FORMAT)
+    # fromisoformat understands hh `+0300` offsets and is much faster than strptime
+    return datetime.fromisoformat(dt)
 
 
 def fix_datetime(dt: str | None) -> str | None:
     return parse_invalid_datetime(dt).isoformat() if dt is not None else None
 
 
+class _Choice:
+    """Spintax group `{a|b|c}`, each alternative is a sequence of nodes"""
+
+    __slots__ = ("alternatives",)
+
+    def __init__(self, alternatives: tuple[tuple[Any, ...], ...]):
+        self.alternatives = alternatives
+
+
+def _flatten_unclosed(alternatives: list[list[Any]]) -> list[Any]:
+    """Unclosed `{` is kept as literal text, nested groups inside it are still expanded"""
+    rv: list[Any] = ["{"]
+    for i, alt in enumerate(alternatives):
+        if i:
+            rv.append("|")
+        rv.extend(alt)
+    return rv
+
+
+def _merge_literals(nodes: list[Any]) -> tuple[Any, ...]:
+    rv: list[Any] = []
+    for node in nodes:
+        if isinstance(node, str) and rv and isinstance(rv[-1], str):
+            rv[-1] += node
+        elif node != "":
+            rv.append(node)
+    return tuple(rv)
+
+
+class Template:
+    """
+    Spintax template parsed once into a tree.
+    Rendering picks one alternative per group in a single pass
+    and applies %-placeholders if they are given.
+    """
+
+    __slots__ = ("nodes", "has_placeholders")
+
+    def __init__(self, source: str):
+        self.nodes = self._parse(source)
+        self.has_placeholders = "%" in source
+
+    @staticmethod
+    def _parse(source: str) -> tuple[Any, ...]:
+        root: list[Any] = []
+        # each frame is a list of alternatives of currently open group
+        stack: list[list[list[Any]]] = []
+        literal_start = 0
+
+        def current() -> list[Any]:
+            return stack[-1][-1] if stack else root
+
+        for i, ch in enumerate(source):
+            if ch not in "{|}":
+                continue
+            if ch == "|" and not stack:
+                continue
+
+            current().append(source[literal_start:i])
+            literal_start = i + 1
+            if ch == "{":
+                stack.append([[]])
+            elif ch == "|":
+                stack[-1].append([])
+            elif not stack:
+                root.append("}")
+            else:
+                alternatives = stack.pop()
+                if len(alternatives) == 1 and not any(alternatives[0]):
+                    # `{}` is not a group
+                    current().append("{}")
+                elif any(isinstance(n, str) and ("{" in n or "}" in n) for alt in alternatives for n in alt):
+                    # group around literal braces is kept as text
+                    current().extend(_flatten_unclosed(alternatives) + ["}"])
+                else:
+                    current().append(_Choice(tuple(_merge_literals(alt) for alt in alternatives)))
+
+        current().append(source[literal_start:])
+        while stack:
+            nodes = _flatten_unclosed(stack.pop())
+            current().extend(nodes)
+
+        return _merge_literals(root)
+
+    def _render(self, nodes: tuple[Any, ...], out: list[str]) -> None:
+        for node in nodes:
+            if isinstance(node, str):
+                out.append(node)
+            else:
+                self._render(random.choice(node.alternatives), out)
+
+    def render(self, placeholders: dict[str, Any] | None = None) -> str:
+        out: list[str] = []
+        self._render(self.nodes, out)
+        text = "".join(out)
+        if placeholders is not None and self.has_placeholders:
+            text %= placeholders
+        return text
+
+
+@lru_cache(maxsize=256)
+def compile_template(s: str) -> Template:
+    return Template(s)
+
+
 def random_text(s: str) -> str:
-    while (
-        temp := re.sub(
-            r"{([^{}]+)}",
-            lambda m: random.choice(
-                m.group(1).split("|"),
-            ),
-            s,
-        )
-    ) != s:
-        s = temp
-    return s
+    return compile_template(s).render()
 
 
 def parse_interval(interval: str) -> tuple[float, float]:
@@ -103,69 +218,101 @@ def parse_interval(interval: str) -> tuple[float, float]:
 
 class BlockedVacanciesDB:
     """
-    Blocked Vacancies database.
-    File: <config_dir>/blocked_vacancies.json
-    Format: {"blocked": [123, 456, 789]}
+    Blocked vacancies: irrelevant by LLM verdict or blocked by user.
+    Table `blocked_vacancies` of the state database, lookups don't load the whole list.
     """
 
     def __init__(self, config_path: str | Path | None = None):
-        self._path = Path(config_path or get_config_path()) / "blocked_vacancies.json"
-        self._lock = Lock()
-        self.blocked: set[int] = set()
-        self._load()
-
-    def _load(self) -> None:
-        """Load data from JSON."""
-        if not self._path.exists():
-            return
-
-        with self._lock:
-            try:
-                with self._path.open("r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    items = data.get("blocked", [])
-                    if isinstance(items, list):
-                        self.blocked = {int(x) for x in items}
-            except Exception as e:
-                print_err(f"Failed to load blocked vacancies: {e}")
-
-    def _save(self) -> None:
-        """Save data to JSON."""
-        self._path.parent.mkdir(parents=True, exist_ok=True)
-        with self._lock:
-            try:
-                with self._path.open("w", encoding="utf-8") as f:
-                    json.dump({"blocked": sorted(list(self.blocked))}, f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                print_err(f"Failed to save blocked vacancies: {e}")
+        self._store = get_state_store(config_path or get_config_path())
+        self._store.import_legacy("blocked_vacancies.json", self._import)
+
+    @staticmethod
+    def _import(conn: sqlite3.Connection, data: dict[str, Any]) -> None:
+        now = time.time()
+        conn.executemany(
+            "INSERT OR IGNORE INTO blocked_vacancies (id, blocked_at) VALUES (?, ?)",
+            [(int(x), now) for x in data.get("blocked", [])],
+        )
+
+    @property
+    def blocked(self) -> set[int]:
+        return set(self.list())
 
     def add(self, vacancy_id: int | str) -> None:
         """Add vacancy to blocked list."""
-        vacancy_id = int(vacancy_id)
-        if vacancy_id not in self.blocked:
-            self.blocked.add(vacancy_id)
-            self._save()
+        with self._store.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blocked_vacancies (id, blocked_at) VALUES (?, ?)", (int(vacancy_id), time.time())
+            )
 
     def remove(self, vacancy_id: int | str) -> None:
         """Delete vacancy from blocked list."""
-        vacancy_id = int(vacancy_id)
-        if vacancy_id in self.blocked:
-            self.blocked.remove(vacancy_id)
-            self._save()
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM blocked_vacancies WHERE id = ?", (int(vacancy_id),))
 
     def is_blocked(self, vacancy_id: int | str) -> bool:
         """Check, if vacancy is blocked."""
-        return int(vacancy_id) in self.blocked
+        return self._store.query_one("SELECT 1 FROM blocked_vacancies WHERE id = ?", (int(vacancy_id),)) is not None
 
     def list(self) -> list[int]:
         """Retrieve list of all blocked vacancies."""
-        return sorted(self.blocked)
+        return [x for (x,) in self._store.query("SELECT id FROM blocked_vacancies ORDER BY id")]
 
     def clear(self) -> None:
         """Clear blocked vacancies list."""
-        self.blocked.clear()
-        self._save()
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM blocked_vacancies")
 
     def is_in_list(self, vacancy_id):
-        array = self.list()
-        return vacancy_id in array
+        return self.is_blocked(vacancy_id)
+
+
+class BlacklistedEmployersDB:
+    """
+    Local copy of employers blacklist.
+    Table `blacklisted_employers` of the state database,
+    `found` is the total reported by API on last sync, it's used to detect remote changes.
+    """
+
+    def __init__(self, config_path: str | Path | None = None):
+        self._store = get_state_store(config_path or get_config_path())
+        self._store.import_legacy("blacklisted_employers.json", self._import)
+        # Lookups are served from memory, the table is only written to
+        self.ids: set[str] = {x for (x,) in self._store.query("SELECT id FROM blacklisted_employers")}
+
+    @staticmethod
+    def _import(conn: sqlite3.Connection, data: dict[str, Any]) -> None:
+        conn.executemany(
+            "INSERT OR IGNORE INTO blacklisted_employers (id) VALUES (?)", [(str(x),) for x in data.get("ids", [])]
+        )
+        StateStore.set_meta(conn, BLACKLIST_FOUND_KEY, data.get("found"))
+
+    @property
+    def found(self) -> int | None:
+        return self._store.get_meta(BLACKLIST_FOUND_KEY)
+
+    def is_synced(self, found: int) -> bool:
+        """Check, if local copy matches total count reported by API."""
+        return self.found == found and len(self) == found
+
+    def replace(self, ids: list[str], found: int) -> None:
+        """Replace local copy with fully downloaded blacklist."""
+        with self._store.transaction() as conn:
+            conn.execute("DELETE FROM blacklisted_employers")
+            conn.executemany("INSERT OR IGNORE INTO blacklisted_employers (id) VALUES (?)", [(x,) for x in ids])
+            StateStore.set_meta(conn, BLACKLIST_FOUND_KEY, found)
+        self.ids = set(ids)
+
+    def add(self, employer_id: str) -> None:
+        """Add employer after it was blacklisted via API."""
+        with self._store.transaction() as conn:
+            if conn.execute("INSERT OR IGNORE INTO blacklisted_employers (id) VALUES (?)", (employer_id,)).rowcount:
+                # Read inside the transaction, so concurrent adds of other processes are counted
+                StateStore.set_meta(conn, BLACKLIST_FOUND_KEY, (self.found or 0) + 1)
+        self.ids.add(employer_id)
+
+    def __contains__(self, employer_id: object) -> bool:
+        return employer_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -1,9 +1,23 @@
+from datetime import datetime, timezone
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pytest
-
-from api.hh_api.schemas.vacancies import Employer, VacanciesResponse, VacancyItem
+import requests
+from bs4 import BeautifulSoup
+
+from api.hh_api.schemas.vacancies import (
+    Employer,
+    Snippet,
+    VacanciesResponse,
+    VacancyItem,
+)
+from constants import INVALID_ISO8601_FORMAT
+from operations.apply_similar.utils.html_text import html_to_text
+from operations.apply_similar.utils.prompt_budget import PromptCompressor
+from operations.apply_similar.utils.ranking import VacancyRanker
+from operations.apply_similar.utils.text_prep import TextPreparePool, prepare_description
+from operations.apply_similar.utils.vacancy_relevance import _parse_verdict
 from src.api.hh_api.schemas.me import MeResponse
 from src.api.hh_api.schemas.vacancy import Experience, KeySkills, VacancyFull
 from src.operations.apply_similar import Operation
@@ -16,6 +30,14 @@ class FakeLLMOptions:
     temperature = 0.7
     max_tokens = 1000
     top_p = 1.0
+    max_concurrency = 4
+    cache = True
+    base_url = None
+    latency_ms = "0"
+    tokens_per_second = 0.0
+    prompt_budget = 800
+    timeout = 60.0
+    hedge = True
 
 
 class FakeLLMPrompts:
@@ -26,6 +48,7 @@ class FakeLLM:
     def __init__(self):
         self.prompts = FakeLLMPrompts()
         self.options = FakeLLMOptions()
+        self.backends = []
         self.messages = SimpleNamespace(footer_msg="footer")
 
 
@@ -45,6 +68,7 @@ def args() -> SimpleNamespace:
     """Mock for Namespace dataclass with all required attributes."""
     return SimpleNamespace(
         data=MagicMock,
+        data_path=None,
         config_path="config_path",
         verbosity=0,
         delay=0.0,
@@ -89,6 +113,11 @@ def args() -> SimpleNamespace:
         clusters=False,
         work_format_remote=False,
         search_all=False,
+        rank=False,
+        max_applies=None,
+        watch=False,
+        watch_interval=(0.0, 0.0),
+        prepare_workers=0,
     )
 
 
@@ -150,6 +179,12 @@ def similar_vacancies_response():
     return resp
 
 
+@pytest.fixture(autouse=True)
+def blacklisted_employers():
+    with patch("src.operations.apply_similar.get_blacklisted_employers", return_value=set()) as mock:
+        yield mock
+
+
 @pytest.fixture
 def operation():
     return Operation()
@@ -220,6 +255,136 @@ def test_apply_vacancy_skips_if_not_relevant(db_mock, operation, args, api, vaca
     operation.vacancy_relevance_llm.verify.assert_called_once()
 
 
+@patch("src.operations.apply_similar.BlockedVacanciesDB")
+def test_prepare_prefetches_only_verified_relevant_vacancies(db_mock, operation, args, api):
+    args.verify_relevance = True
+    args.block_irrelevant = True
+    db_mock.return_value.is_in_list.side_effect = lambda vacancy_id: vacancy_id == "1"
+    vacancies = []
+    for i in range(25):
+        v = vacancy_item()
+        v.id = str(i)
+        vacancies.append(v)
+
+    operation.args = args
+    operation.api_client = api
+    operation.limit_exceeded = False
+    operation.text_pool = MagicMock()
+    operation.text_pool.prepare.side_effect = lambda descriptions: [()] * len(descriptions)
+    operation.vacancy_relevance_llm = MagicMock()
+    operation.vacancy_relevance_llm.verify_many.side_effect = lambda batch: [v.id != "2" for v in batch]
+
+    def apply(vacancy):
+        # Quota is spent on the first apply
+        operation.limit_exceeded = True
+
+    operation._apply_vacancy = MagicMock(side_effect=apply)
+
+    operation._apply_vacancies(vacancies)
+
+    fetched = [c.args[0] for c in api.vacancy.get.call_args_list]
+    assert fetched == [str(i) for i in range(10) if i not in (1, 2)]
+    operation._apply_vacancy.assert_called_once_with(vacancies[0])
+    # Blocked vacancy isn't verified by LLM
+    verified = [v.id for v in operation.vacancy_relevance_llm.verify_many.call_args.args[0]]
+    assert verified == [str(i) for i in range(10) if i != 1]
+
+
+def ranked_vacancy(vacancy_id: str, name: str, published_at: str):
+    v = vacancy_item()
+    v.id = vacancy_id
+    v.name = name
+    v.published_at = published_at
+    v.salary_range = None
+    v.snippet = Snippet(requirement=None, responsibility=None)
+    return v
+
+
+def test_ranker_orders_by_score():
+    fresh = datetime.now(timezone.utc).strftime(INVALID_ISO8601_FORMAT)
+    relevant = ranked_vacancy("1", "Python backend developer", fresh)
+    irrelevant = ranked_vacancy("2", "Sales manager", fresh)
+    blocked = ranked_vacancy("3", "Python backend developer", fresh)
+
+    ranker = VacancyRanker("Python backend developer, Django, PostgreSQL")
+    ranked = ranker.rank([irrelevant, relevant, blocked], blocked={3})
+
+    assert [x.vacancy.id for x in ranked] == ["1", "2"]
+
+
+@patch("src.operations.apply_similar.BlockedVacanciesDB")
+@patch("src.operations.apply_similar.Config.load", return_value=FakeLLMConfig())
+def test_apply_ranked_stops_at_max_applies(mock_config, db_mock, operation, args, api):
+    fresh = datetime.now(timezone.utc).strftime(INVALID_ISO8601_FORMAT)
+    vacancies = [ranked_vacancy(str(i), "Backend developer", fresh) for i in range(1, 4)]
+    api.similar_vacancies.get.return_value = MagicMock(items=vacancies, pages=1)
+    db_mock.return_value.blocked = set()
+    args.rank = True
+    args.max_applies = 2
+
+    operation._apply_vacancy = MagicMock(return_value=True)
+    operation.run(args, api)
+
+    assert operation._apply_vacancy.call_count == 2
+
+
+@pytest.mark.parametrize("block_irrelevant, applied", [(False, ["1", "2", "3"]), (True, ["2", "3"])])
+@patch("src.operations.apply_similar.BlockedVacanciesDB")
+@patch("src.operations.apply_similar.Config.load", return_value=FakeLLMConfig())
+def test_apply_ranked_drops_blocked_only_with_block_irrelevant(
+    mock_config, db_mock, operation, args, api, block_irrelevant, applied
+):
+    fresh = datetime.now(timezone.utc).strftime(INVALID_ISO8601_FORMAT)
+    vacancies = [ranked_vacancy(str(i), "Backend developer", fresh) for i in range(1, 4)]
+    api.similar_vacancies.get.return_value = MagicMock(items=vacancies, pages=1)
+    db_mock.return_value.blocked = {1}
+    args.rank = True
+    args.block_irrelevant = block_irrelevant
+
+    operation._apply_vacancy = MagicMock(return_value=True)
+    operation.run(args, api)
+
+    assert sorted(call.args[0].id for call in operation._apply_vacancy.call_args_list) == applied
+
+
+@patch("src.operations.apply_similar.Data")
+@patch("src.operations.apply_similar.time.sleep", side_effect=[None, KeyboardInterrupt])
+@patch("src.operations.apply_similar.Config.load", return_value=FakeLLMConfig())
+def test_watch_applies_only_new_vacancies(mock_config, mock_sleep, data_mock, operation, args, api, vacancy):
+    args.watch = True
+    api.similar_vacancies.get.return_value = MagicMock(items=[vacancy], pages=1)
+
+    operation._apply_vacancy = MagicMock(return_value=True)
+    operation.run(args, api)
+
+    assert api.similar_vacancies.get.call_count == 2
+    operation._apply_vacancy.assert_called_once_with(vacancy)
+    second_call_params = api.similar_vacancies.get.call_args_list[1].args[1]
+    assert "date_from" in second_call_params
+
+
+
+@patch("src.operations.apply_similar.Data")
+@patch("src.operations.apply_similar.time.sleep", side_effect=[None, KeyboardInterrupt])
+@patch("src.operations.apply_similar.Config.load", return_value=FakeLLMConfig())
+def test_watch_survives_network_errors_and_saves_refreshed_token(
+    mock_config, mock_sleep, data_mock, operation, args, api, vacancy
+):
+    args.watch = True
+    api.similar_vacancies.get.side_effect = [
+        requests.ConnectionError("connection reset"),
+        MagicMock(items=[vacancy], pages=1),
+    ]
+    api.get_access_token.return_value = {"access_token": "new"}
+    data_mock.return_value.get.return_value = {"access_token": "old"}
+
+    operation._apply_vacancy = MagicMock(return_value=True)
+    operation.run(args, api)
+
+    operation._apply_vacancy.assert_called_once_with(vacancy)
+    data_mock.return_value.save.assert_called_with(token={"access_token": "new"})
+    assert data_mock.return_value.save.call_count == 2
+
 # @patch("src.operations.apply_similar.random.uniform", lambda *_: 0)
 # @patch("src.operations.apply_similar.time.sleep", lambda _: None)
 # @patch("src.operations.apply_similar.Config.load", return_value=FakeLLMConfig())
@@ -267,3 +432,68 @@ def test_apply_vacancy_skips_if_not_relevant(db_mock, operation, args, api, vaca
 #     operation._send_apply =
 # MagicMock(side_effect=ApiError(response=FakeResponse, data={})) # pyright: ignore[reportArgumentType]
 #     # assert operation._apply_vacancy(vacancy) is False
+
+
+def test_prompt_compressor_drops_employer_boilerplate_and_keeps_requirements():
+    about = "<p>Мы крупнейшая компания на рынке, работаем с 1990 года и растем каждый год</p>"
+    offer = "<p><strong>Мы предлагаем:</strong></p><ul><li>ДМС со стоматологией, фитнес и бесплатные обеды</li></ul>"
+    requirements = "<p><strong>Требования:</strong></p><ul><li>Python от 3 лет</li><li>PostgreSQL</li></ul>"
+    compressor = PromptCompressor()
+
+    first = compressor.compress(about + requirements + offer, "1", budget=10)
+    assert "Требования: Python от 3 лет PostgreSQL" in first
+    assert "ДМС" not in first
+
+    second = compressor.compress(about + "<p>Go, Kubernetes</p>", "1")
+    assert second == "Go, Kubernetes"
+    assert compressor.compress(about, "2") != ""
+    assert compressor.tokens_saved > 0
+
+
+def test_prompt_compressor_keeps_shared_requirements_of_one_employer():
+    requirements = (
+        "<p><strong>Требования:</strong></p><ul><li>Опыт коммерческой разработки на Python от 3 лет</li></ul>"
+    )
+    offer = "<p><strong>Мы предлагаем:</strong></p><ul><li>ДМС со стоматологией, фитнес и бесплатные обеды</li></ul>"
+    compressor = PromptCompressor()
+
+    compressor.compress(requirements + offer + "<p>Backend</p>", "1")
+    second = compressor.compress(requirements + offer + "<p>Frontend</p>", "1")
+
+    assert second == "Требования: Опыт коммерческой разработки на Python от 3 лет Мы предлагаем: Frontend"
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "<p>Python &amp; Django</p><ul><li> REST&nbsp;API </li><li></li></ul>",
+        "<div>a<script>var x = '<p>no</p>';</script>b<style>p {}</style><!-- comment -->c</div>",
+        "text <b>bold<i>nested</i></b> tail<br/>next &laquo;quoted&raquo;",
+        "<p>unclosed <strong>tags",
+    ],
+)
+def test_html_to_text_matches_beautifulsoup(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style"]):
+        tag.extract()
+
+    assert html_to_text(html) == soup.get_text(separator=" ", strip=True)
+
+
+def test_text_prepare_pool_matches_in_process_preparation():
+    descriptions = [f"<p><strong>Требования:</strong></p><ul><li>Python {i}</li></ul><p>О нас</p>" for i in range(20)]
+    pool = TextPreparePool(workers=2, chunk_size=4)
+    try:
+        prepared = pool.prepare(descriptions)
+    finally:
+        pool.close()
+
+    assert prepared == [prepare_description(html) for html in descriptions]
+    assert PromptCompressor().compress(descriptions[0], prepared=prepared[0]) == PromptCompressor().compress(
+        descriptions[0]
+    )
+
+
+def test_parse_verdict_ignores_whitespace():
+    assert _parse_verdict(" 0\n") is False
+    assert _parse_verdict("1") is True
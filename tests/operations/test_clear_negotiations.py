@@ -0,0 +1,146 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from api.errors import ApiError, ResourceNotFound
+from src.api.hh_api.schemas.negotiations import Employer, NegotiationState
+from src.constants import INVALID_ISO8601_FORMAT
+from src.operations.clear_negotiations import (
+    ClearNegotiationsJournal,
+    JournalAction,
+    Operation,
+)
+
+
+def negotiation(nid: str, state_id: str, employer_id: str | None = "E1", updated_at="2020-01-01T00:00:00+0300"):
+    employer = Employer(id=employer_id, alternate_url=f"https://hh.ru/employer/{employer_id}", name="Company")
+    vacancy = SimpleNamespace(alternate_url=f"https://hh.ru/vacancy/{nid}", name="Developer", employer=employer)
+    return SimpleNamespace(
+        id=nid,
+        url=f"https://api.hh.ru/negotiations/{nid}",
+        state=NegotiationState(id=state_id, name=state_id),
+        updated_at=updated_at,
+        decline_allowed=False,
+        vacancy=vacancy,
+    )
+
+
+@pytest.fixture
+def args(tmp_path):
+    return SimpleNamespace(
+        older_than=30, all=False, blacklist_discard=True, workers=4, plan=False, resume=False, data_path=tmp_path
+    )
+
+
+@pytest.fixture
+def api():
+    api = MagicMock()
+    api.negotiations.delete.return_value = True
+    return api
+
+
+@patch("src.operations.clear_negotiations.get_blacklisted_employers")
+def test_run_deletes_in_parallel_and_blacklists_each_employer_once(mock_blacklisted, args, api):
+    blacklisted = MagicMock()
+    blacklisted.__contains__.side_effect = lambda employer_id: employer_id == "E3"
+    mock_blacklisted.return_value = blacklisted
+    items = [
+        negotiation("1", "discard", "E1"),
+        negotiation("2", "discard", "E1"),
+        negotiation("3", "discard", "E3"),
+        negotiation("4", "discard", None),
+        negotiation("5", "invitation", "E5"),
+    ]
+    operation = Operation()
+    operation._get_active_negotiations = MagicMock(return_value=items)
+
+    operation.run(args, api)
+
+    assert sorted(c.args[0] for c in api.negotiations.delete.call_args_list) == ["1", "2", "3", "4"]
+    api.blacklisted_employers.put.assert_called_once_with("E1")
+    blacklisted.add.assert_called_once_with("E1")
+
+
+def test_delete_plan_filters_by_state_and_age(args):
+    fresh = datetime.now(timezone.utc).strftime(INVALID_ISO8601_FORMAT)
+    items = [
+        negotiation("1", "response"),
+        negotiation("2", "response", updated_at=fresh),
+        negotiation("3", "discard", updated_at=fresh),
+        negotiation("4", "invitation"),
+    ]
+
+    assert [item.id for item in Operation()._get_delete_plan(args, items)] == ["1", "3"]
+    args.all = True
+    assert len(Operation()._get_delete_plan(args, items)) == 4
+
+
+@patch("src.operations.clear_negotiations.get_blacklisted_employers", return_value=set())
+def test_plan_does_not_change_anything(_, args, api, capsys):
+    args.plan = True
+    operation = Operation()
+    operation._get_active_negotiations = MagicMock(return_value=[negotiation("1", "discard")])
+
+    operation.run(args, api)
+
+    api.negotiations.delete.assert_not_called()
+    api.blacklisted_employers.put.assert_not_called()
+    assert "Будет удалено откликов: 1, заблокировано работодателей: 1" in capsys.readouterr().out
+
+
+def test_rerun_continues_from_journal(args, api):
+    args.resume = True
+    journal = ClearNegotiationsJournal(args.data_path)
+    journal.start(
+        [
+            JournalAction(kind="delete", target_id="1", url=None, name="", done=True),
+            JournalAction(kind="delete", target_id="2", url=None, name=""),
+            JournalAction(kind="blacklist", target_id="E1", url=None, name="Company"),
+        ]
+    )
+    api.negotiations.delete.side_effect = ResourceNotFound(response=MagicMock(), data={})
+    operation = Operation()
+    operation._get_active_negotiations = MagicMock()
+
+    operation.run(args, api)
+
+    operation._get_active_negotiations.assert_not_called()
+    api.negotiations.delete.assert_called_once_with("2", with_decline_message=False)
+    api.blacklisted_employers.put.assert_called_once_with("E1")
+    assert ClearNegotiationsJournal(args.data_path).actions == []
+
+
+@patch("src.operations.clear_negotiations.get_blacklisted_employers")
+def test_employer_is_not_blacklisted_when_delete_failed(mock_blacklisted, args, api):
+    mock_blacklisted.return_value = MagicMock(__contains__=MagicMock(return_value=False))
+
+    def delete(nid, **_):
+        if nid == "2":
+            raise ApiError(MagicMock(), {})
+        return True
+
+    api.negotiations.delete.side_effect = delete
+    items = [negotiation("1", "discard", "E1"), negotiation("2", "discard", "E1"), negotiation("3", "discard", "E3")]
+    operation = Operation()
+    operation._get_active_negotiations = MagicMock(return_value=items)
+
+    operation.run(args, api)
+
+    api.blacklisted_employers.put.assert_called_once_with("E3")
+    pending = ClearNegotiationsJournal(args.data_path).pending
+    assert [(x.kind, x.target_id) for x in pending] == [("delete", "2"), ("blacklist", "E1")]
+
+
+@patch("src.operations.clear_negotiations.get_blacklisted_employers", return_value=set())
+def test_new_run_replaces_unfinished_journal(_, args, api):
+    ClearNegotiationsJournal(args.data_path).start([JournalAction(kind="delete", target_id="old", url=None, name="")])
+    args.blacklist_discard = False
+    operation = Operation()
+    operation._get_active_negotiations = MagicMock(return_value=[negotiation("1", "discard")])
+
+    operation.run(args, api)
+
+    api.negotiations.delete.assert_called_once_with("1", with_decline_message=False)
+    assert ClearNegotiationsJournal(args.data_path).actions == []
@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from src.operations.reply_employers import Operation
+from src.operations.reply_employers.store import ChatStore
+from src.operations.reply_employers.utils import (
+    AIDrafts,
+    load_message_history,
+    prefetch_message_histories,
+)
+
+
+def messages_response(nid: str):
+    item = SimpleNamespace(text=f"msg {nid}", author=SimpleNamespace(participant_type="employer"))
+    return SimpleNamespace(items=[item], pages=1)
+
+
+def test_prefetch_message_histories_keeps_order():
+    api = MagicMock()
+    api.negotiations_messages.get.side_effect = lambda nid, **_: messages_response(nid)
+    negotiations = [SimpleNamespace(id=str(i)) for i in range(5)]
+
+    result = [
+        (negotiation.id, history.result()[0])
+        for negotiation, history in prefetch_message_histories(api, negotiations, window=2)
+    ]
+
+    assert result == [(str(i), [f"<- msg {i}"]) for i in range(5)]
+    assert api.negotiations_messages.get.call_count == 5
+
+
+def test_prefetch_message_histories_loads_inline_without_window():
+    api = MagicMock()
+    threads = []
+
+    def get(nid, **_):
+        threads.append(threading.current_thread())
+        return messages_response(nid)
+
+    api.negotiations_messages.get.side_effect = get
+    histories = prefetch_message_histories(api, [SimpleNamespace(id=str(i)) for i in range(3)], window=0)
+
+    negotiation, history = next(histories)
+    assert (negotiation.id, history.result()[0]) == ("0", ["<- msg 0"])
+    assert api.negotiations_messages.get.call_count == 1
+    assert [h.result()[0] for _, h in histories] == [["<- msg 1"], ["<- msg 2"]]
+    assert threads == [threading.main_thread()] * 3
+
+
+def test_load_message_history_uses_store_for_unchanged_negotiations(tmp_path):
+    api = MagicMock()
+    api.negotiations_messages.get.side_effect = lambda nid, **_: messages_response(nid)
+    store = ChatStore(tmp_path)
+    negotiation = SimpleNamespace(id="1", updated_at="2025-01-01T00:00:00+0300", has_updates=False)
+
+    first = load_message_history(api, negotiation, store)
+    second = load_message_history(api, negotiation, store)
+    assert second[0] == first[0] == ["<- msg 1"]
+    assert second[1].author.participant_type == "employer"
+    assert api.negotiations_messages.get.call_count == 1
+
+    negotiation.updated_at = "2025-01-02T00:00:00+0300"
+    load_message_history(api, negotiation, store)
+    assert api.negotiations_messages.get.call_count == 2
+
+
+def history_future(participant_type: str) -> Future:
+    future: Future = Future()
+    last_message = SimpleNamespace(text="Когда удобно?", author=SimpleNamespace(participant_type=participant_type))
+    future.set_result((["<- Когда удобно?"], last_message))
+    return future
+
+
+@patch("src.operations.reply_employers.utils.process_ai", return_value="Завтра в 12:00")
+def test_ai_drafts_only_for_chats_where_employer_spoke_last(mock_ai):
+    drafts = AIDrafts(config=MagicMock(), workers=2)
+    drafts.submit(SimpleNamespace(id="1"), history_future("employer"))
+    drafts.submit(SimpleNamespace(id="2"), history_future("applicant"))
+
+    assert drafts.take("1") == "Завтра в 12:00"
+    assert drafts.take("2") == ""
+    assert drafts.take("3") == ""
+    mock_ai.assert_called_once()
+    drafts.close()
+
+
+def test_get_negotiations_pushes_status_filter_to_api():
+    operation = Operation()
+    operation.api_client = MagicMock()
+    operation.api_client.negotiations.get.side_effect = [
+        SimpleNamespace(items=["n1", "n2"], pages=2),
+        SimpleNamespace(items=["n3"], pages=2),
+    ]
+    operation.max_pages = 25
+    operation.only_invitations = False
+    operation.only_interviews = True
+
+    assert operation._get_negotiations() == ["n1", "n2", "n3"]
+    operation.api_client.negotiations.get.assert_called_with(page=1, per_page=100, status="interview")
@@ -0,0 +1,291 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.ai import LLMFactory
+from src.ai.base import BaseLLM, LLMError, ModelConfig, Prompts
+from src.ai.cache import CachedLLM, LLMResponseCache, get_response_cache
+from src.ai.hedge import HedgedLLM
+from src.ai.models.groq import GroqLLM
+from src.ai.models.local import LocalLLM
+from src.ai.rate_limit import RateLimiter, parse_duration
+from src.ai.router import LLMRouter
+
+
+class FakeLLM(BaseLLM):
+    def send_message(self, user_message: str, *args, **kwargs) -> str:
+        return user_message
+
+
+@patch.dict(LLMFactory.providers, {"fake": FakeLLM})
+def test_factory_reuses_clients_with_same_config():
+    cfg = ModelConfig("registry-model")
+    first = LLMFactory.get("fake", cfg, Prompts("system"))
+
+    assert LLMFactory.get("fake", ModelConfig("registry-model"), Prompts("system")) is first
+    assert LLMFactory.get("fake", cfg, Prompts("other system")) is not first
+
+
+def test_cached_llm_serves_repeated_prompts_and_evicts_least_recent(tmp_path):
+    llm = MagicMock(wraps=FakeLLM(ModelConfig("cache-model"), Prompts("system")))
+    llm.cfg, llm.prompts = ModelConfig("cache-model"), Prompts("system")
+    cache = LLMResponseCache(tmp_path, max_entries=2)
+    chat = CachedLLM(llm, "fake", cache)
+
+    assert chat.send_message("a") == "a"
+    assert chat.send_message("a") == "a"
+    assert llm.send_message.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    tokens = []
+    assert chat.stream_message("a", on_token=tokens.append) == "a"
+    assert tokens == ["a"]
+
+    chat.send_message("b")
+    chat.send_message("a")
+    chat.send_message("c")  # evicts "b"
+    calls = llm.send_message.call_count
+    chat.send_message("a")
+    chat.send_message("b")
+    assert llm.send_message.call_count == calls + 1
+
+
+@patch.dict(LLMFactory.providers, {"fake": FakeLLM})
+def test_factory_caches_responses_in_data_path(tmp_path):
+    chat = LLMFactory.get("fake", ModelConfig("data-path-model"), Prompts("system"), data_path=tmp_path)
+
+    assert chat.send_message("a") == "a"
+    assert (tmp_path / "state.sqlite3").exists()
+    assert chat.response_cache is get_response_cache(tmp_path)
+    assert LLMFactory.get("fake", ModelConfig("data-path-model"), Prompts("system")) is not chat
+
+
+def stream_chunks(*deltas: str, finish_reason: str = "stop"):
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=d), finish_reason=None)]) for d in deltas
+    ]
+    last = SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=finish_reason)
+    chunks.append(SimpleNamespace(choices=[last]))
+    return iter(chunks)
+
+
+def raw_response(parsed, headers=None):
+    return SimpleNamespace(headers=headers or {}, parse=lambda: parsed)
+
+
+def test_groq_stream_stops_on_end_tag_without_continuation():
+    llm = GroqLLM(ModelConfig("model", api_key="key"), Prompts("system"))
+    llm.client = MagicMock()
+    llm.client.chat.completions.with_raw_response.create.return_value = raw_response(
+        stream_chunks("Добрый ", "день <E", "ND> лишнее")
+    )
+
+    tokens: list[str] = []
+    msg = llm.stream_message("vacancy", on_token=tokens.append, verify_tag_end=True)
+
+    assert msg == "Добрый день"
+    assert "".join(tokens) == "Добрый день "
+    assert llm.client.chat.completions.with_raw_response.create.call_count == 1
+
+
+def test_groq_read_stream_reports_first_token_time():
+    llm = GroqLLM(ModelConfig("model", api_key="key"), Prompts("system"))
+    before = time.perf_counter()
+
+    text, finished, first_token_at = llm._read_stream(stream_chunks("", "Добрый", " день"), None, None)
+
+    assert (text, finished) == ("Добрый день", True)
+    assert first_token_at is not None and first_token_at >= before
+
+
+def test_groq_stream_continues_when_cut_by_max_tokens():
+    llm = GroqLLM(ModelConfig("model", api_key="key"), Prompts("system"))
+    llm.client = MagicMock()
+    llm.client.chat.completions.with_raw_response.create.side_effect = [
+        raw_response(stream_chunks("Добрый ", finish_reason="length")),
+        raw_response(stream_chunks("день")),
+    ]
+
+    assert llm.stream_message("vacancy", verify_tag_end=True) == "Добрый день"
+    assert llm.client.chat.completions.with_raw_response.create.call_count == 2
+
+
+@patch("src.ai.models.groq.time.sleep")
+def test_groq_retries_server_errors(_):
+    from groq import InternalServerError
+
+    llm = GroqLLM(ModelConfig("model", api_key="key"), Prompts("system"))
+    llm.client = MagicMock()
+    error = InternalServerError("Bad Gateway", response=MagicMock(status_code=502), body=None)
+    llm.client.chat.completions.with_raw_response.create.side_effect = [
+        error,
+        raw_response(stream_chunks("Добрый день")),
+    ]
+
+    assert llm.stream_message("vacancy") == "Добрый день"
+
+    llm.client.chat.completions.with_raw_response.create.side_effect = [error] * 3
+    with pytest.raises(LLMError):
+        llm.stream_message("vacancy")
+
+
+class FlakyLLM(BaseLLM):
+    def send_message(self, user_message: str, *args, **kwargs) -> str:
+        if user_message == "fail":
+            raise LLMError("boom")
+        return user_message.upper()
+
+
+def test_send_many_keeps_order_and_returns_errors_per_item():
+    llm = FlakyLLM(ModelConfig("model", max_concurrency=2), Prompts("system"))
+
+    results = llm.send_many(["a", "fail", "c"])
+
+    assert results[0] == "A" and results[2] == "C"
+    assert isinstance(results[1], LLMError)
+
+
+class BarrierLLM(BaseLLM):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Passes only if both calls are in flight at the same time
+        self.barrier = threading.Barrier(2)
+
+    def send_message(self, user_message: str, *args, **kwargs) -> str:
+        self.barrier.wait(timeout=5)
+        return user_message.upper()
+
+
+def test_asend_runs_messages_concurrently():
+    llm = BarrierLLM(ModelConfig("model", max_concurrency=2), Prompts("system"))
+
+    async def main():
+        return await asyncio.gather(llm.asend("a"), llm.asend("b"))
+
+    assert asyncio.run(main()) == ["A", "B"]
+
+
+def test_local_llm_is_deterministic():
+    letters = LocalLLM(ModelConfig("letter"), Prompts("system"))
+    tokens = []
+    letter = letters.stream_message("Python developer", on_token=tokens.append)
+
+    assert letter == letters.send_message("Python developer") == "".join(tokens)
+    assert letter != letters.send_message("Go developer")
+
+    verdicts = LocalLLM(ModelConfig("verdict"), Prompts("system"))
+    answers = [verdicts.send_message(f"vacancy {i}") for i in range(50)]
+    assert set(answers) == {"0", "1"}
+    assert answers == [verdicts.send_message(f"vacancy {i}") for i in range(50)]
+
+
+def test_rate_limiter_learns_limits_from_headers():
+    assert parse_duration("2m59.56s") == 179.56
+    assert parse_duration("500ms") == 0.5
+    assert parse_duration("7") == 7.0
+
+    limiter = RateLimiter()
+    limiter.update(
+        {
+            "x-ratelimit-limit-requests": "14400",
+            "x-ratelimit-remaining-requests": "14399",
+            "x-ratelimit-reset-requests": "6s",
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "250",
+            "x-ratelimit-reset-tokens": "45s",
+        },
+        completion_tokens=100,
+    )
+
+    assert limiter.tokens.capacity == 1000
+    assert 0.2 < limiter.headroom < 0.3
+    assert limiter.estimate([{"content": "x" * 400}], max_tokens=1000) == 200
+
+
+def test_rate_limiter_waits_for_tokens_and_retry_after():
+    limiter = RateLimiter(rpm=600, tpm=600)
+    limiter.tokens.available = 0
+
+    started = time.monotonic()
+    limiter.acquire(2)  # 10 tokens per second
+    assert 0.15 < time.monotonic() - started < 1.0
+
+    limiter.rate_limited({"retry-after": "0.2"})
+    started = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_router_fails_over_and_cools_down_failed_backend():
+    broken = FlakyLLM(ModelConfig("broken"), Prompts("system"))
+    broken.send_message = MagicMock(side_effect=LLMError("down"))
+    healthy = FlakyLLM(ModelConfig("healthy"), Prompts("system"))
+    router = LLMRouter([("broken", broken), ("healthy", healthy)])
+
+    assert router.send_message("hi") == "HI"
+    assert router.send_message("again") == "AGAIN"
+    # Failed backend is skipped while cooling down
+    assert broken.send_message.call_count == 1
+
+    stats = router.stats()
+    assert (stats["broken"].failures, stats["healthy"].calls) == (1, 2)
+    assert stats["healthy"].latency is not None
+    assert router.fresh().stats() == router.stats()
+
+
+class SlowFirstLLM(BaseLLM):
+    """The first call hangs, the next ones answer at once"""
+
+    def __init__(self, cfg: ModelConfig, prompts: Prompts):
+        super().__init__(cfg, prompts)
+        self.calls = 0
+
+    def send_message(self, user_message: str, *args, **kwargs) -> str:
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+
+@patch("src.ai.hedge.DEFAULT_HEDGE_DELAY", 0.05)
+def test_hedged_llm_takes_first_answer_and_counts_wins():
+    chat = HedgedLLM(SlowFirstLLM(ModelConfig("model"), Prompts("system")))
+    tokens = []
+
+    assert chat.stream_message("hi", on_token=tokens.append) == "fast"
+    assert tokens == ["fast"]
+    assert (chat.hedge_stats.hedges, chat.hedge_stats.hedge_wins) == (1, 1)
+
+    hanging = SlowFirstLLM(ModelConfig("model", timeout=0.1), Prompts("system"))
+    hanging.send_message = MagicMock(side_effect=lambda *args, **kwargs: time.sleep(0.5))
+    chat = HedgedLLM(hanging)
+    with pytest.raises(LLMError):
+        chat.send_message("hi")
+    assert chat.hedge_stats.timeouts == 1
+
+
+class FailingFirstLLM(SlowFirstLLM):
+    """The first call fails after the hedge was sent, the hedge answers later"""
+
+    def send_message(self, user_message: str, *args, **kwargs) -> str:
+        self.calls += 1
+        if self.calls == 1:
+            time.sleep(0.1)
+            raise LLMError("backend failed")
+        time.sleep(0.2)
+        return "hedge"
+
+
+@patch("src.ai.hedge.DEFAULT_HEDGE_DELAY", 0.05)
+def test_hedged_llm_sends_one_duplicate_when_first_attempt_fails():
+    llm = FailingFirstLLM(ModelConfig("model"), Prompts("system"))
+    chat = HedgedLLM(llm)
+
+    assert chat.send_message("hi") == "hedge"
+    assert llm.calls == 2
+    assert (chat.hedge_stats.hedges, chat.hedge_stats.hedge_wins) == (1, 1)
@@ -0,0 +1,53 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from src.api import errors
+from src.api.client import ApiClient
+
+
+def test_concurrent_forbidden_refreshes_token_once(monkeypatch):
+    client = ApiClient(access_token="old", refresh_token="r1", access_expires_at=0, delay=0)
+    barrier = threading.Barrier(4)
+    refreshes = []
+
+    def request(self, method, endpoint, params, delay, **kwargs):
+        if self.access_token == "old":
+            barrier.wait(timeout=5)
+            raise errors.Forbidden(MagicMock(), {})
+        return {"ok": True}
+
+    def refresh(refresh_token):
+        refreshes.append(refresh_token)
+        time.sleep(0.05)
+        return {"access_token": "new", "refresh_token": "r2", "access_expires_at": time.time() + 3600}
+
+    monkeypatch.setattr("src.api.client.BaseClient.request", request)
+    client.oauth_client.refresh_access_token = refresh
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get("/me"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refreshes == ["r1"]
+    assert results == [{"ok": True}] * 4
+
+
+def test_sequential_requests_are_spaced_from_previous_response():
+    client = ApiClient(delay=0.05)
+    client.session = MagicMock()
+    started = []
+
+    def request(*args, **kwargs):
+        started.append(time.monotonic())
+        time.sleep(0.1)
+        return MagicMock(status_code=200, json=dict)
+
+    client.session.request.side_effect = request
+    client.get("/me")
+    client.get("/me")
+
+    assert started[1] - started[0] >= 0.15
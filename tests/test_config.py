@@ -0,0 +1,35 @@
+import os
+
+from src.config import Config
+
+CONFIG = """
+[llm.chat_reply.options]
+provider = "groq"
+model_name = "{model}"
+
+[[llm.chat_reply.backends]]
+provider = "local"
+model_name = "verdict"
+"""
+
+
+def test_load_is_cached_until_file_changes(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text(CONFIG.format(model="first"), encoding="utf-8")
+
+    config = Config.load(path)
+    assert Config.load(path) is config
+    assert config.llm.chat_reply.options.model_name == "first"
+    assert config.llm.chat_reply.backends[0].model_name == "verdict"
+
+    path.write_text(CONFIG.format(model="second"), encoding="utf-8")
+    stat = path.stat()
+    # Same size edit within mtime granularity is still detected by mtime_ns
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    reloaded = Config.load(path)
+    assert reloaded is not config
+    assert reloaded.llm.chat_reply.options.model_name == "second"
+
+    reloaded.update("candidate.info", "python")
+    reloaded.save(path)
+    assert Config.load(path) is reloaded
@@ -0,0 +1,16 @@
+from src.main import HHApplicantTool, Namespace
+
+
+def test_operations_are_set_up_on_dispatch():
+    parser = HHApplicantTool().create_parser()
+    subparsers = parser._subparsers._group_actions[0]
+
+    # Help is read from module source, parsers are empty until the command is chosen
+    assert subparsers._name_parser_map["whoami"]._actions[1:] == []
+    assert "Sends current user" in parser.format_help()
+
+    args = parser.parse_args(["whoami"], namespace=Namespace())
+    assert type(args.run.__self__).__module__ == "src.operations.whoami"
+
+    args = parser.parse_args(["apply-similar", "--rank", "--max-applies", "3"], namespace=Namespace())
+    assert (args.rank, args.max_applies) == (True, 3)
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from src.mixins import get_blacklisted_employers
+
+
+def blacklisted_page(ids: list[str], found: int, pages: int):
+    return SimpleNamespace(items=[SimpleNamespace(id=x) for x in ids], found=found, pages=pages)
+
+
+def test_blacklist_is_downloaded_only_when_found_changes(tmp_path):
+    api = MagicMock()
+    api.blacklisted_employers.get.side_effect = [
+        blacklisted_page(["1", "2"], found=3, pages=2),
+        blacklisted_page(["3"], found=3, pages=2),
+    ]
+    db = get_blacklisted_employers(api, tmp_path)
+    assert "3" in db and len(db) == 3
+
+    api.blacklisted_employers.get.side_effect = [blacklisted_page(["1", "2"], found=3, pages=2)]
+    db = get_blacklisted_employers(api, tmp_path)
+    assert "3" in db
+    assert api.blacklisted_employers.get.call_count == 3
+
+
+def test_blacklist_local_add_keeps_cache_in_sync(tmp_path):
+    api = MagicMock()
+    api.blacklisted_employers.get.return_value = blacklisted_page(["1"], found=1, pages=1)
+    db = get_blacklisted_employers(api, tmp_path)
+    db.add("2")
+
+    api.blacklisted_employers.get.return_value = blacklisted_page(["1", "2"], found=2, pages=1)
+    db = get_blacklisted_employers(api, tmp_path)
+    assert "2" in db
+    assert api.blacklisted_employers.get.call_count == 2
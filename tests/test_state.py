@@ -0,0 +1,86 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.utils import BlacklistedEmployersDB, BlockedVacanciesDB, Data
+from state import StateStore, get_state_store
+
+
+def test_data_save_writes_only_given_keys(tmp_path):
+    data = Data(tmp_path)
+    data.save(token={"access_token": "a", "refresh_token": "r", "access_expires_at": 1, "token_type": "bearer"})
+    data.save(user_agent="agent")
+
+    # Other process changed the token meanwhile, saving user agent must not overwrite it
+    other = StateStore(tmp_path)
+    with other.transaction() as conn:
+        conn.execute("UPDATE tokens SET access_token = 'b'")
+    data.save(user_agent="agent2")
+
+    loaded = Data(tmp_path)
+    assert loaded["token"]["access_token"] == "b"
+    assert loaded["user_agent"] == "agent2"
+
+
+def test_legacy_json_files_are_imported_once(tmp_path):
+    (tmp_path / "data.json").write_text(json.dumps({"token": {"access_token": "a"}, "user_agent": "agent"}))
+    (tmp_path / "blocked_vacancies.json").write_text(json.dumps({"blocked": [2, 1]}))
+    (tmp_path / "blacklisted_employers.json").write_text(json.dumps({"found": 2, "ids": ["E1", "E2"]}))
+
+    assert Data(tmp_path)["token"]["access_token"] == "a"
+    assert BlockedVacanciesDB(tmp_path).list() == [1, 2]
+    employers = BlacklistedEmployersDB(tmp_path)
+    assert employers.is_synced(2) and "E1" in employers
+
+    assert not (tmp_path / "data.json").exists()
+    assert (tmp_path / "blocked_vacancies.json.migrated").exists()
+    BlockedVacanciesDB(tmp_path).remove(1)
+    assert BlockedVacanciesDB(tmp_path).list() == [2]
+
+
+def test_concurrent_writers_share_the_store(tmp_path):
+    # Separate connections behave like separate CLI processes
+    stores = [StateStore(tmp_path) for _ in range(4)]
+
+    def block(i: int) -> None:
+        with stores[i % len(stores)].transaction() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM blocked_vacancies").fetchone()[0]
+            conn.execute("INSERT INTO blocked_vacancies (id, blocked_at) VALUES (?, ?)", (i, count))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(block, range(200)))
+
+    assert BlockedVacanciesDB(tmp_path).list() == list(range(200))
+    # Read-modify-write transactions were serialized
+    assert sorted(x for (x,) in stores[0].query("SELECT blocked_at FROM blocked_vacancies")) == list(range(200))
+    assert get_state_store(tmp_path).query_one("PRAGMA journal_mode")[0] == "wal"
+    # Data classes and direct users of the store share one connection per dir
+    assert Data(tmp_path)._store is get_state_store(tmp_path)
+
+
+def test_failed_transaction_is_rolled_back(tmp_path):
+    employers = BlacklistedEmployersDB(tmp_path)
+    employers.replace(["E1"], found=1)
+
+    with pytest.raises(RuntimeError):
+        with get_state_store(tmp_path).transaction() as conn:
+            conn.execute("DELETE FROM blacklisted_employers")
+            raise RuntimeError
+
+    assert employers.is_synced(1)
+
+
+def test_blacklist_lookups_do_not_query_the_store(tmp_path):
+    employers = BlacklistedEmployersDB(tmp_path)
+    employers.replace(["E1"], found=1)
+    employers.add("E2")
+
+    with patch.object(StateStore, "query_one", side_effect=AssertionError), patch.object(
+        StateStore, "query", side_effect=AssertionError
+    ):
+        assert "E1" in employers and "E2" in employers and "E3" not in employers
+        assert len(employers) == 2
+
+    assert BlacklistedEmployersDB(tmp_path).is_synced(2)
@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+from src.utils import compile_template, random_text
+
+
+def test_random_text_expands_nested_groups():
+    outputs = {random_text("x{a|{b|c}}y") for _ in range(200)}
+    assert outputs == {"xay", "xby", "xcy"}
+
+
+def test_random_text_keeps_non_groups_literal():
+    assert random_text("{}") == "{}"
+    assert random_text("a}b|c") == "a}b|c"
+    assert random_text("{a{b}") == "{ab"
+
+
+@patch("src.utils.random.choice", side_effect=lambda seq: seq[-1])
+def test_template_renders_placeholders(_):
+    template = compile_template("{Здравствуйте|Добрый день}, %(employer_name)s")
+    assert template.render({"employer_name": "Company"}) == "Добрый день, Company"
+
+
+def test_compile_template_is_cached():
+    assert compile_template("{a|b}") is compile_template("{a|b}")